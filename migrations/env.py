@@ -51,6 +51,22 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_name(name, type_, parent_names):
+    """Leave the issue search objects (src/search.py) out of autogenerate.
+
+    They are created by raw DDL, so they are not in the metadata, and a
+    comparison would otherwise drop them: the SQLite FTS5 table with its
+    shadow tables, and the PostgreSQL tsvector column and its index.
+    """
+    if type_ == "table":
+        return not name.startswith("issues_fts")
+    if type_ == "column":
+        return not (parent_names.get("table_name") == "issues" and name == "search_vector")
+    if type_ == "index":
+        return name != "ix_issues_search_vector"
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +81,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -97,6 +114,7 @@ def run_migrations_online():
             connection=connection,
             target_metadata=get_metadata(),
             process_revision_directives=process_revision_directives,
+            include_name=include_name,
             **current_app.extensions['migrate'].configure_args
         )
 
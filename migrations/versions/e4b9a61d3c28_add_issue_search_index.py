@@ -0,0 +1,118 @@
+"""Add issue full-text search index
+
+Revision ID: e4b9a61d3c28
+Revises: c81d5e0f2a67
+Create Date: 2026-10-19 11:31:07.553912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b9a61d3c28'
+down_revision = 'c81d5e0f2a67'
+branch_labels = None
+depends_on = None
+
+# Copied from src/search.py at the time of this revision, so later changes to
+# the app code cannot change what this migration does.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts
+    USING fts5(description, reporter, room_label, tokenize = 'unicode61 remove_diacritics 2')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS issues_fts_ai AFTER INSERT ON issues BEGIN
+        INSERT INTO issues_fts (rowid, description, reporter, room_label)
+        SELECT new.id, new.description, coalesce(new.reporter_id, ''), r.building || ' ' || r.number
+        FROM rooms r WHERE r.id = new.room_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS issues_fts_au AFTER UPDATE OF description, reporter_id, room_id ON issues BEGIN
+        DELETE FROM issues_fts WHERE rowid = old.id;
+        INSERT INTO issues_fts (rowid, description, reporter, room_label)
+        SELECT new.id, new.description, coalesce(new.reporter_id, ''), r.building || ' ' || r.number
+        FROM rooms r WHERE r.id = new.room_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS issues_fts_ad AFTER DELETE ON issues BEGIN
+        DELETE FROM issues_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS rooms_fts_au AFTER UPDATE OF building, number ON rooms BEGIN
+        UPDATE issues_fts SET room_label = new.building || ' ' || new.number
+        WHERE rowid IN (SELECT id FROM issues WHERE room_id = new.id);
+    END
+    """,
+]
+
+POSTGRES_CREATE = [
+    "ALTER TABLE issues ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_issues_search_vector ON issues USING gin (search_vector)",
+    """
+    CREATE OR REPLACE FUNCTION issues_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(
+                (SELECT building || ' ' || number FROM rooms WHERE id = NEW.room_id), '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.reporter_id, '')), 'B') ||
+            setweight(to_tsvector('simple', NEW.description), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS issues_search_vector_trg ON issues",
+    """
+    CREATE TRIGGER issues_search_vector_trg BEFORE INSERT OR UPDATE OF description, reporter_id, room_id
+    ON issues FOR EACH ROW EXECUTE FUNCTION issues_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rooms_search_vector_refresh() RETURNS trigger AS $$
+    BEGIN
+        UPDATE issues SET room_id = room_id WHERE room_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS rooms_search_vector_trg ON rooms",
+    """
+    CREATE TRIGGER rooms_search_vector_trg AFTER UPDATE OF building, number
+    ON rooms FOR EACH ROW EXECUTE FUNCTION rooms_search_vector_refresh()
+    """,
+]
+
+
+def upgrade():
+    # Hand-written: the index is dialect specific (FTS5 on SQLite, tsvector on PostgreSQL).
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_CREATE:
+            op.execute(statement)
+        op.execute(
+            "INSERT INTO issues_fts (rowid, description, reporter, room_label) "
+            "SELECT i.id, i.description, coalesce(i.reporter_id, ''), r.building || ' ' || r.number "
+            "FROM issues i JOIN rooms r ON r.id = i.room_id"
+        )
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            op.execute(statement)
+        op.execute("UPDATE issues SET room_id = room_id")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for name in ('issues_fts_ai', 'issues_fts_au', 'issues_fts_ad', 'rooms_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS issues_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS rooms_search_vector_trg ON rooms")
+        op.execute("DROP TRIGGER IF EXISTS issues_search_vector_trg ON issues")
+        op.execute("DROP FUNCTION IF EXISTS rooms_search_vector_refresh()")
+        op.execute("DROP FUNCTION IF EXISTS issues_search_vector_update()")
+        op.execute("DROP INDEX IF EXISTS ix_issues_search_vector")
+        op.execute("ALTER TABLE issues DROP COLUMN IF EXISTS search_vector")
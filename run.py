@@ -1,7 +1,13 @@
+import os
+
 from src import create_app
+from src.status_scheduler import status_scheduler
 
 app = create_app()
 
 if __name__ == "__main__":
+    # With the debug reloader, only the child process that serves requests runs the scheduler.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        status_scheduler.start()
     # The important part is host="0.0.0.0"
     app.run(host="0.0.0.0", port=5000, debug=True)
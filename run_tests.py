@@ -15,8 +15,6 @@ os.environ['PYTHONWARNINGS'] = 'ignore'
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
-from tests.test_application import TestRoomScheduleApplication
-
 
 class MinimalTestResult(unittest.TextTestResult):
     """Custom test result class for formatted output"""
@@ -86,7 +84,7 @@ if __name__ == "__main__":
     
     # Load and run tests
     loader = unittest.TestLoader()
-    suite = loader.loadTestsFromTestCase(TestRoomScheduleApplication)
+    suite = loader.discover(os.path.join(project_root, 'tests'))
     
     # Run with custom runner (silent during execution)
     runner = MinimalTestRunner(verbosity=0, stream=open(os.devnull, 'w'))
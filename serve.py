@@ -0,0 +1,106 @@
+"""
+Production launcher: serves the app with gunicorn instead of the Flask dev server.
+
+Configuration comes from the environment:
+    HOST / PORT            bind address (default 0.0.0.0:5000)
+    WEB_CONCURRENCY        worker processes (default 2 * CPUs + 1)
+    WEB_THREADS            threads per worker (default 4)
+    WEB_TIMEOUT            request timeout in seconds (default 60)
+    WEB_GRACEFUL_TIMEOUT   seconds a stopping worker may spend draining (default 120)
+    WEB_PRELOAD            "0" to disable loading the app before forking
+
+Send SIGHUP to the master for a graceful reload (new workers start, old ones
+finish their requests and in-flight imports first) and SIGTERM to stop.
+"""
+import multiprocessing
+import os
+import signal
+
+from gunicorn.app.base import BaseApplication
+
+from src import create_app, db
+from src.lifecycle import lifecycle
+from src.status_scheduler import status_scheduler
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _dispose_engines(app):
+    # Pooled connections must never be shared across a fork.
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_fork(server, worker):
+    # Only a preloaded app exists at this point; otherwise the worker loads its own.
+    if worker.app.application is not None:
+        _dispose_engines(worker.app.application)
+
+
+def post_worker_init(worker):
+    # Flip readiness to "draining" the moment the worker is asked to stop,
+    # before gunicorn stops accepting and waits on open requests.
+    original_handler = worker.handle_exit
+
+    def handle_exit(sig, frame):
+        lifecycle.begin_drain()
+        original_handler(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_exit)
+
+    # Every worker starts the room status scheduler; a lock file lets only
+    # one of them run it, and another takes over if that worker goes away.
+    status_scheduler.start()
+
+
+def worker_exit(server, worker):
+    # gunicorn has already spent part of graceful_timeout draining requests;
+    # imports only get what is left of it (wait_idle returns at once when idle).
+    timeout = lifecycle.drain_remaining(worker.cfg.graceful_timeout)
+    if not lifecycle.shutdown(timeout=timeout):
+        worker.log.warning("Worker %s exited with imports still running", worker.pid)
+
+
+class CampusRoomsServer(BaseApplication):
+    def __init__(self, options: dict | None = None):
+        self.options = options or {}
+        self.application = None
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        if self.application is None:
+            self.application = create_app()
+            if self.cfg.preload_app:
+                _dispose_engines(self.application)
+        return self.application
+
+
+def build_options() -> dict:
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = _env_int("PORT", 5000)
+    return {
+        "bind": f"{host}:{port}",
+        "workers": _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1),
+        "threads": _env_int("WEB_THREADS", 4),
+        "worker_class": "gthread",
+        "timeout": _env_int("WEB_TIMEOUT", 60),
+        "graceful_timeout": _env_int("WEB_GRACEFUL_TIMEOUT", 120),
+        "preload_app": os.environ.get("WEB_PRELOAD", "1") != "0",
+        "accesslog": "-",
+        "post_fork": post_fork,
+        "post_worker_init": post_worker_init,
+        "worker_exit": worker_exit,
+    }
+
+
+if __name__ == "__main__":
+    CampusRoomsServer(build_options()).run()
@@ -2,26 +2,45 @@ import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from .assets import StaticAssets
+from .compression import Compress
 from .config import Config
 
 db = SQLAlchemy()
 migrate = Migrate()
+compress = Compress()
+static_assets = StaticAssets()
 
-def create_app():
+def create_app(config_object=Config):
     app = Flask(__name__, instance_relative_config=True)
-    app.config.from_object(Config)
+    app.config.from_object(config_object)
 
     db.init_app(app)
     migrate.init_app(app, db)
+    compress.init_app(app)
+    static_assets.init_app(app)
 
     # IMPORT INSIDE create_app AFTER db.init_app()
     from .models import Room, Schedule, ScheduleImport, Issue
+    from . import changelog, search, storage  # search registers the full-text index DDL
+    from .audit import audit
+    from .cache import cache
+    from .snapshot import room_snapshot
+    from .status_scheduler import status_scheduler
+    changelog.init_app(app)
+    cache.init_app(app)
+    room_snapshot.init_app(app)
+    audit.init_app(app)
+    storage.init_app(app)
+    status_scheduler.init_app(app)
     
     from .routes.dashboard import dashboard_bp
     from .routes.rooms import rooms_bp
     from .routes.admin import admin_bp
     from .routes.imports import imports_bp
     from .routes.issues import issues_bp
+    from .routes.api import api_bp
+    from .routes.health import health_bp
 
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
@@ -30,5 +49,7 @@ def create_app():
     app.register_blueprint(admin_bp)
     app.register_blueprint(imports_bp)
     app.register_blueprint(issues_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(health_bp)
 
     return app
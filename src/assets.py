@@ -0,0 +1,66 @@
+import hashlib
+import os
+import threading
+
+from flask import current_app, request
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+class StaticAssets:
+    """Append a content hash to static URLs and cache versioned assets forever.
+
+    ``url_for('static', filename=...)`` gains a ``v=<hash>`` query argument, so a
+    changed file gets a new URL and the old one can be cached with
+    ``immutable`` by browsers and the kiosks.
+    """
+
+    def __init__(self, app=None):
+        self._hashes: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("STATIC_MAX_AGE", ONE_YEAR)
+        self._static_folder = app.static_folder
+        app.url_defaults(self._add_version)
+        app.after_request(self._cache_headers)
+
+    def file_hash(self, filename: str) -> str | None:
+        path = os.path.join(self._static_folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        cached = self._hashes.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(64 * 1024), b""):
+                digest.update(block)
+        value = digest.hexdigest()[:12]
+        with self._lock:
+            self._hashes[filename] = (mtime, value)
+        return value
+
+    def _add_version(self, endpoint, values):
+        if endpoint != "static" or "v" in values or "filename" not in values:
+            return
+        version = self.file_hash(values["filename"])
+        if version:
+            values["v"] = version
+
+    def _cache_headers(self, response):
+        if request.endpoint != "static" or response.status_code != 200:
+            return response
+        version = request.args.get("v")
+        if version and version == self.file_hash(request.view_args.get("filename", "")):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = current_app.config["STATIC_MAX_AGE"]
+            response.cache_control.immutable = True
+        return response
@@ -0,0 +1,139 @@
+import os
+import queue
+import threading
+from datetime import datetime
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import insert
+
+from . import db
+from .lifecycle import lifecycle
+from .models import AuditLog
+
+
+class _AppAuditQueue:
+    """The queue, writer thread and settings of one app."""
+
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue(maxsize=app.config["AUDIT_QUEUE_SIZE"])
+        self.writer = None
+        self.writer_pid = None
+        self.start_lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, event: dict):
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            self.app.logger.warning("Audit queue full; dropped %s event", event["action"])
+
+    def flush(self):
+        if self.writer_pid != os.getpid() or not self.writer.is_alive():
+            # No writer in this process (never started, or forked away): write inline.
+            batch = self._drain(block=False)
+            while batch:
+                self._write(batch)
+                batch = self._drain(block=False)
+        self.queue.join()
+
+    def _ensure_writer(self):
+        pid = os.getpid()
+        if self.writer_pid == pid and self.writer.is_alive():
+            return
+        with self.start_lock:
+            if self.writer_pid == pid and self.writer.is_alive():
+                return
+            self.writer = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self.writer_pid = pid
+            self.writer.start()
+
+    def _drain(self, block: bool) -> list[dict]:
+        size = self.app.config["AUDIT_BATCH_SIZE"]
+        batch = []
+        try:
+            if block:
+                batch.append(self.queue.get(timeout=self.app.config["AUDIT_FLUSH_INTERVAL"]))
+            while len(batch) < size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch: list[dict]):
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(insert(AuditLog.__table__), batch)
+        except Exception:
+            self.app.logger.exception("Failed to write %d audit events", len(batch))
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def _run(self):
+        while True:
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+
+
+class AuditLogger:
+    """Queue audit events in memory and write them in batches from a background thread.
+
+    Views call ``record()`` after their own commit; the event is put on a
+    bounded queue and the request returns without an extra INSERT. The writer
+    thread is started lazily in each process, so it also works after a
+    gunicorn fork, and the queue is flushed when the process shuts down.
+
+    Each app bound with ``init_app`` gets its own queue and writer in
+    ``app.extensions["audit"]``; events go to the queue of the current app.
+    """
+
+    def __init__(self, app=None):
+        self._queues: list[_AppAuditQueue] = []
+        lifecycle.on_shutdown(self.flush)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("AUDIT_QUEUE_SIZE", 10000)
+        app.config.setdefault("AUDIT_BATCH_SIZE", 200)
+        app.config.setdefault("AUDIT_FLUSH_INTERVAL", 1.0)
+        app_queue = _AppAuditQueue(app)
+        self._queues.append(app_queue)
+        app.extensions["audit"] = app_queue
+
+    @property
+    def dropped(self) -> int:
+        """Events the current app had to drop because its queue was full."""
+        return current_app.extensions["audit"].dropped
+
+    def record(self, action: str, entity_type: str, entity_id=None, actor=None, details=None):
+        if actor is None and has_request_context():
+            actor = request.remote_addr
+        current_app.extensions["audit"].put({
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "actor": actor,
+            "details": details,
+            "created_at": datetime.utcnow(),
+        })
+
+    def flush(self):
+        """Write everything queued so far and wait for the writer to catch up.
+
+        Inside an app context only that app's queue is flushed; at process
+        shutdown (no app context) every bound app's queue is.
+        """
+        if has_app_context():
+            current_app.extensions["audit"].flush()
+            return
+        for app_queue in self._queues:
+            app_queue.flush()
+
+
+audit = AuditLogger()
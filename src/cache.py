@@ -0,0 +1,396 @@
+import contextlib
+import functools
+import hashlib
+import os
+import pickle
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import click
+from flask import current_app, make_response, request
+from sqlalchemy import event
+
+from . import db
+from .changelog import latest_cursor
+
+try:  # POSIX only; without it concurrent tag bumps may collapse into one
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+_MISSING = object()
+# Pseudo-tag for the change-log cursor, which every tagged entry records
+# when there is no shared tier (see Cache).
+_CHANGE_LOG_TAG = "@change-log"
+# Each shared-tier file starts with its expiry time, so a sweep can read it
+# without unpickling the value.
+_EXPIRY = struct.Struct("!d")
+# Temporary files a crashed writer left behind are removed after this long.
+_STALE_TMP_SECONDS = 3600
+
+
+class LRUTier:
+    """In-process tier: a bounded, thread-safe LRU of (expires_at, tag_versions, value)."""
+
+    name = "memory"
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class FileSystemTier:
+    """Optional shared tier for all workers on one host: one pickle file per key.
+
+    Files are never read back once expired, but only ``sweep`` deletes them.
+    Tag versions are counters kept in one small file per tag.
+    """
+
+    name = "filesystem"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "tags"), exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _tag_path(self, tag: str) -> str:
+        return os.path.join(self.directory, "tags", _safe_tag(tag))
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as fh:
+                (expires_at,) = _EXPIRY.unpack(fh.read(_EXPIRY.size))
+                if expires_at < time.time():
+                    return None
+                return pickle.load(fh)
+        except (OSError, EOFError, struct.error, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(_EXPIRY.pack(entry[0]))
+            pickle.dump(entry, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def tag_version(self, tag: str) -> int:
+        try:
+            with open(self._tag_path(tag)) as fh:
+                return int(fh.read())
+        except (OSError, ValueError):
+            return 0
+
+    def bump_tag(self, tag: str):
+        """Increment the tag's counter; the lock keeps two workers from writing the same value."""
+        path = self._tag_path(tag)
+        with open(f"{path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as fh:
+                fh.write(str(self.tag_version(tag) + 1))
+            os.replace(tmp_path, path)
+
+    def sweep(self, max_bytes: int | None = None, now: float | None = None) -> dict:
+        """Delete expired entries, then the oldest ones until at most ``max_bytes`` remain.
+
+        Returns how many files were removed for each reason and the bytes left.
+        """
+        now = now or time.time()
+        expired = evicted = 0
+        live = []
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir() or bucket.name == "tags":
+                continue
+            for entry in os.scandir(bucket.path):
+                # Another worker may replace or sweep the same file meanwhile.
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    if entry.name.endswith(".tmp"):
+                        if stat.st_mtime < now - _STALE_TMP_SECONDS:
+                            os.remove(entry.path)
+                            expired += 1
+                        continue
+                    try:
+                        with open(entry.path, "rb") as fh:
+                            (expires_at,) = _EXPIRY.unpack(fh.read(_EXPIRY.size))
+                    except struct.error:
+                        expires_at = 0.0
+                    if expires_at < now:
+                        os.remove(entry.path)
+                        expired += 1
+                    else:
+                        live.append((stat.st_mtime, stat.st_size, entry.path))
+
+        remaining = sum(size for _, size, _ in live)
+        if max_bytes is not None:
+            for _, size, path in sorted(live):
+                if remaining <= max_bytes:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    evicted += 1
+                remaining -= size
+        return {"expired": expired, "evicted": evicted, "bytes": remaining}
+
+
+def _safe_tag(tag: str) -> str:
+    return hashlib.sha1(tag.encode("utf-8")).hexdigest()
+
+
+class Cache:
+    """Two-level cache (process LRU, then an optional shared filesystem tier).
+
+    Entries carry tags; committing a change to a tagged table bumps the tag
+    version so every entry stored under the old version is ignored. With the
+    shared tier enabled, tag versions live there too, so an invalidation in
+    one worker reaches the others within ``CACHE_TAG_REFRESH`` seconds.
+    Without it, tag versions are per process, so tagged entries also record
+    the change-log cursor: a write committed by another worker invalidates
+    them within the same delay (any write does, whatever its tags).
+    """
+
+    def __init__(self):
+        self.memory = None
+        self.shared = None
+        self._tag_versions: dict[str, int] = {}
+        self._tag_checked: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_ENABLED", True)
+        app.config.setdefault("CACHE_MAX_ENTRIES", 2048)
+        app.config.setdefault("CACHE_DIR", None)
+        app.config.setdefault("CACHE_DIR_MAX_BYTES", None)
+        app.config.setdefault("CACHE_DEFAULT_TTL", 60)
+        app.config.setdefault("CACHE_TAG_REFRESH", 1.0)
+        app.config.setdefault("CACHE_TTL_POLICIES", {})
+
+        self.memory = LRUTier(app.config["CACHE_MAX_ENTRIES"])
+        self.shared = FileSystemTier(app.config["CACHE_DIR"]) if app.config["CACHE_DIR"] else None
+        self._tag_versions.clear()
+        self._tag_checked.clear()
+        self.stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0, "sets": 0, "invalidations": 0}
+        app.extensions["cache"] = self
+        app.cli.add_command(sweep_cache_command)
+
+        if not event.contains(db.session, "after_commit", _invalidate_committed):
+            event.listen(db.session, "after_commit", _invalidate_committed)
+
+    # -- tags -------------------------------------------------------------
+
+    def _current_version(self, tag: str) -> int:
+        if self.shared is None and tag != _CHANGE_LOG_TAG:
+            return self._tag_versions.get(tag, 0)
+        now = time.monotonic()
+        refresh = current_app.config["CACHE_TAG_REFRESH"]
+        if now - self._tag_checked.get(tag, 0.0) >= refresh:
+            self._tag_versions[tag] = latest_cursor() if tag == _CHANGE_LOG_TAG else self.shared.tag_version(tag)
+            self._tag_checked[tag] = now
+        return self._tag_versions.get(tag, 0)
+
+    def tag_versions(self, tags) -> tuple:
+        """The current version of each tag, to pass to ``set`` for a value about to be computed.
+
+        Read them before reading the data: a write that commits in between
+        then bumps a version past the stored one instead of hiding behind it.
+        """
+        tags = sorted(tags)
+        if tags and self.shared is None:
+            tags.append(_CHANGE_LOG_TAG)
+        return tuple((tag, self._current_version(tag)) for tag in tags)
+
+    def invalidate_tags(self, tags):
+        tags = set(tags)
+        if not tags or self.memory is None:
+            return
+        with self._lock:
+            for tag in tags:
+                if self.shared is not None:
+                    self.shared.bump_tag(tag)
+                    self._tag_checked.pop(tag, None)
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            # This commit moved the cursor too; re-read it rather than store under the old one.
+            self._tag_checked.pop(_CHANGE_LOG_TAG, None)
+            self.stats["invalidations"] += len(tags)
+
+    # -- get / set --------------------------------------------------------
+
+    def _valid(self, entry) -> bool:
+        expires_at, versions, _ = entry
+        if expires_at < time.time():
+            return False
+        return all(self._current_version(tag) == version for tag, version in versions)
+
+    def get(self, key, default=None):
+        if self.memory is None or not current_app.config["CACHE_ENABLED"]:
+            return default
+        entry = self.memory.get(key)
+        if entry is not None and self._valid(entry):
+            self.stats["memory_hits"] += 1
+            return entry[2]
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None and self._valid(entry):
+                self.memory.set(key, entry)
+                self.stats["shared_hits"] += 1
+                return entry[2]
+        self.stats["misses"] += 1
+        return default
+
+    def set(self, key, value, ttl=None, tags=(), versions=None):
+        """Store ``value``; ``versions`` (from ``tag_versions``) default to the tags' versions now."""
+        if self.memory is None or not current_app.config["CACHE_ENABLED"]:
+            return
+        if versions is None:
+            versions = self.tag_versions(tags)
+        entry = (time.time() + self.resolve_ttl(ttl), versions, value)
+        self.memory.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(key, entry)
+        self.stats["sets"] += 1
+
+    def resolve_ttl(self, ttl) -> float:
+        """``ttl`` may be seconds or the name of an entry in CACHE_TTL_POLICIES."""
+        if ttl is None:
+            return current_app.config["CACHE_DEFAULT_TTL"]
+        if isinstance(ttl, str):
+            return current_app.config["CACHE_TTL_POLICIES"].get(ttl, current_app.config["CACHE_DEFAULT_TTL"])
+        return ttl
+
+    def clear(self):
+        """Drop this process's entries (``flask sweep-cache`` cleans up the shared tier)."""
+        if self.memory is not None:
+            self.memory.clear()
+
+    def metrics(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["shared_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return dict(
+            self.stats,
+            entries=len(self.memory) if self.memory is not None else 0,
+            hit_ratio=round(hits / lookups, 3) if lookups else None,
+            shared_tier=self.shared is not None,
+        )
+
+    # -- decorators -------------------------------------------------------
+
+    def memoize(self, ttl=None, tags=()):
+        """Cache a function's return value by its arguments (must be picklable for the shared tier)."""
+
+        def decorator(func):
+            prefix = f"memo:{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = f"{prefix}:{args!r}:{sorted(kwargs.items())!r}"
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    versions = self.tag_versions(tags)
+                    value = func(*args, **kwargs)
+                    self.set(key, value, ttl=ttl, versions=versions)
+                return value
+
+            wrapper.uncached = func
+            return wrapper
+
+        return decorator
+
+    def cached_view(self, ttl=None, tags=()):
+        """Cache successful GET responses keyed by path and query string.
+
+        ``tags`` may be a callable taking the view arguments. Only for views
+        whose output does not depend on the session (no flashed messages),
+        such as the JSON API.
+        """
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != "GET":
+                    return view(*args, **kwargs)
+                key = f"view:{request.full_path}"
+                cached = self.get(key)
+                if cached is not None:
+                    body, status, mimetype = cached
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                view_tags = tags(*args, **kwargs) if callable(tags) else tags
+                versions = self.tag_versions(view_tags)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self.set(key, (response.get_data(), 200, response.mimetype), ttl=ttl, versions=versions)
+                response.headers["X-Cache"] = "MISS"
+                return response
+
+            return wrapper
+
+        return decorator
+
+
+def _invalidate_committed(session):
+    tags = session.info.pop("changed_tags", None)
+    if tags:
+        cache.invalidate_tags(tags)
+
+
+cache = Cache()
+
+
+@click.command("sweep-cache")
+@click.option("--max-bytes", type=int, default=None, help="Size cap for the shared tier (defaults to CACHE_DIR_MAX_BYTES).")
+def sweep_cache_command(max_bytes):
+    """Delete expired entries from the shared cache directory."""
+    shared = current_app.extensions["cache"].shared
+    if shared is None:
+        click.echo("No shared cache tier configured (CACHE_DIR is not set).")
+        return
+    max_bytes = max_bytes if max_bytes is not None else current_app.config["CACHE_DIR_MAX_BYTES"]
+    result = shared.sweep(max_bytes)
+    click.echo(
+        f"Removed {result['expired']} expired and {result['evicted']} evicted cache file(s); "
+        f"{result['bytes']} bytes remain."
+    )
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, inspect, select
+
+from . import db
+from .models import ChangeLog
+
+# Tables whose changes are published on the /api/v1/changes feed.
+TRACKED_TABLES = {"rooms", "schedules", "recurrences", "issues"}
+
+
+def schedule_day_tag(day) -> str:
+    """Cache tag for everything derived from the schedules of one date."""
+    return f"schedules:{day.isoformat()}"
+
+
+def note_tags(session, tags):
+    """Remember cache tags to invalidate once the session commits (see cache.py)."""
+    session.info.setdefault("changed_tags", set()).update(tags)
+
+
+def _entries_for(session):
+    now = datetime.utcnow()
+    for operation, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            table = getattr(obj, "__tablename__", None)
+            if table not in TRACKED_TABLES:
+                continue
+            if operation == "update":
+                if not session.is_modified(obj, include_collections=False):
+                    continue
+                if table == "rooms" and inspect(obj).attrs.building.history.has_changes():
+                    # Kiosks need to know a room left their building (see kiosk._delta).
+                    yield obj, {"table_name": table, "row_id": obj.id, "operation": "move", "changed_at": now}
+                    continue
+            yield obj, {"table_name": table, "row_id": obj.id, "operation": operation, "changed_at": now}
+
+
+def _record_flush(session, flush_context):
+    entries = []
+    tags = set()
+    for obj, entry in _entries_for(session):
+        entries.append(entry)
+        tags.add(entry["table_name"])
+        if entry["table_name"] == "schedules" and obj.date is not None:
+            tags.add(schedule_day_tag(obj.date))
+    if entries:
+        session.connection().execute(insert(ChangeLog.__table__), entries)
+        note_tags(session, tags)
+
+
+def record_changes(session, table: str, row_ids, operation: str = "update", tags=()):
+    """Log changes made with bulk/Core statements that bypass the ORM flush.
+
+    ``tags`` names extra cache tags the change affects (e.g. the schedule
+    dates touched); the table name itself is always invalidated.
+    """
+    now = datetime.utcnow()
+    entries = [
+        {"table_name": table, "row_id": row_id, "operation": operation, "changed_at": now}
+        for row_id in row_ids
+    ]
+    if entries:
+        session.execute(insert(ChangeLog.__table__), entries)
+        note_tags(session, {table, *tags})
+
+
+def changes_since(cursor: int, limit: int):
+    """Return up to ``limit`` log rows after ``cursor`` as (id, table, row_id, operation, changed_at).
+
+    Ids are handed out when a row is inserted, not when its transaction
+    commits. With several concurrent writers on PostgreSQL, a transaction
+    holding id 41 can commit after one holding id 42 has been read, so a
+    reader that already moved its cursor to 42 never sees 41. SQLite
+    serialises writers, so this cannot happen there. Readers that must not
+    miss anything should re-read a small window below their cursor.
+    """
+    stmt = (
+        select(ChangeLog.id, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.operation, ChangeLog.changed_at)
+        .where(ChangeLog.id > cursor)
+        .order_by(ChangeLog.id)
+        .limit(limit)
+    )
+    return db.session.execute(stmt).all()
+
+
+def latest_cursor() -> int:
+    return db.session.execute(select(db.func.max(ChangeLog.id))).scalar() or 0
+
+
+def oldest_cursor() -> int:
+    """The lowest cursor the log can still answer completely (one below its oldest row)."""
+    oldest = db.session.execute(select(func.min(ChangeLog.id))).scalar()
+    return oldest - 1 if oldest else 0
+
+
+def prune(retention_days: int, keep_after: int | None = None, now: datetime | None = None) -> int:
+    """Delete log rows older than ``retention_days``; returns how many were removed.
+
+    Rows after ``keep_after`` (the oldest cursor a consumer still uses) are
+    kept whatever their age. The newest row is always kept: it carries the
+    current cursor that snapshots, kiosks and the status scheduler compare
+    against, and on SQLite a deleted highest id would be handed out again.
+    """
+    now = now or datetime.utcnow()
+    stmt = delete(ChangeLog).where(
+        ChangeLog.changed_at < now - timedelta(days=retention_days),
+        ChangeLog.id < latest_cursor(),
+    )
+    if keep_after is not None:
+        stmt = stmt.where(ChangeLog.id <= keep_after)
+    removed = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return removed
+
+
+@click.command("prune-changes")
+@click.option("--days", type=int, default=None, help="Retention in days (defaults to CHANGE_LOG_RETENTION_DAYS).")
+@click.option("--keep-after", type=int, default=None, help="Keep every row after this cursor, whatever its age.")
+def prune_changes_command(days, keep_after):
+    """Delete old change-log rows."""
+    days = days if days is not None else current_app.config["CHANGE_LOG_RETENTION_DAYS"]
+    removed = prune(days, keep_after)
+    click.echo(f"Removed {removed} change-log row(s) older than {days} days.")
+
+
+def init_app(app):
+    app.config.setdefault("CHANGE_LOG_RETENTION_DAYS", 30)
+    app.cli.add_command(prune_changes_command)
+    if not event.contains(db.session, "after_flush", _record_flush):
+        event.listen(db.session, "after_flush", _record_flush)
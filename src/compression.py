@@ -0,0 +1,137 @@
+import zlib
+
+from flask import current_app, request
+
+try:  # Brotli is optional; we fall back to gzip when it is not installed.
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+DEFAULT_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/csv",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+}
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Parse Accept-Encoding, dropping anything the client marked with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in {"0", "0.0", "0.00", "0.000"}:
+            continue
+        accepted.add(token)
+    return accepted
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._obj.compress(chunk)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._obj.process(chunk)
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class Compress:
+    """after_request hook that gzip/brotli-encodes buffered and streamed responses."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BROTLI_QUALITY", 5)
+        app.config.setdefault("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES)
+        app.after_request(self._after_request)
+
+    def _choose_encoding(self) -> str | None:
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _stream(self, encoding: str):
+        if encoding == "br":
+            return _BrotliStream(current_app.config["COMPRESS_BROTLI_QUALITY"])
+        return _GzipStream(current_app.config["COMPRESS_LEVEL"])
+
+    def _after_request(self, response):
+        config = current_app.config
+        if response.mimetype not in config["COMPRESS_MIMETYPES"]:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or request.method == "HEAD"
+        ):
+            return response
+
+        encoding = self._choose_encoding()
+        if encoding is None:
+            return response
+
+        streamed = response.is_streamed or response.direct_passthrough
+        if streamed:
+            length = response.content_length
+            if length is not None and length < config["COMPRESS_MIN_SIZE"]:
+                return response
+            response.response = self._compress_iter(response.response, self._stream(encoding))
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < config["COMPRESS_MIN_SIZE"]:
+                return response
+            stream = self._stream(encoding)
+            response.set_data(stream.compress(data) + stream.finish())
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
+
+    @staticmethod
+    def _compress_iter(chunks, stream):
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                out = stream.compress(chunk)
+                if out:
+                    yield out
+            yield stream.finish()
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
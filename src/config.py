@@ -9,5 +9,22 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{DB_PATH}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = UPLOAD_DIR
-    MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5 MB cap for schedule imports
+    MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20 MB cap per request (several schedule files)
     ALLOWED_EXTENSIONS = {"csv", "xlsx"}
+    UPLOAD_RETENTION_DAYS = 180  # stored originals of older imports are swept
+    CHANGE_LOG_RETENTION_DAYS = 30  # older /api/v1/changes history is pruned by `flask prune-changes`
+    IMPORT_PREVIEW_TTL = 60 * 60  # seconds a dry-run parse is kept for its commit step
+    IMPORT_MAX_WORKERS = min(4, os.cpu_count() or 1)  # processes used to parse workbook sheets
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller bodies are not worth compressing
+    STATIC_MAX_AGE = 365 * 24 * 60 * 60  # fingerprinted static files never change
+    CACHE_MAX_ENTRIES = 2048  # in-process LRU tier size
+    CACHE_DIR = os.environ.get("CACHE_DIR")  # optional shared tier for all workers on this host
+    CACHE_DIR_MAX_BYTES = None  # size cap `flask sweep-cache` enforces on CACHE_DIR (None: expired entries only)
+    CACHE_DEFAULT_TTL = 60  # seconds
+    CACHE_TTL_POLICIES = {"timeline": 300, "api": 30}  # seconds per policy name
+    KIOSK_POLL_SECONDS = 30  # how often a kiosk asks for changes
+    EXPORT_BATCH_DAYS = 31  # days of schedules read per query while exporting
+    EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024  # bytes of XLSX kept in memory before spilling to disk
+    AUTO_STATUS_ENABLED = True  # flip room statuses at scheduled open/close times
+    AUTO_STATUS_SYNC_INTERVAL = 30  # seconds between checks for schedule changes from other workers
+
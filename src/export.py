@@ -0,0 +1,105 @@
+"""
+Schedule exports (CSV and XLSX) produced batch by batch, so memory stays
+flat however many schedule rows and recurrences there are.
+"""
+import csv
+import io
+import re
+from tempfile import SpooledTemporaryFile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .recurrence import occurrence_batches
+from .snapshot import room_snapshot
+
+EXPORT_HEADER = ("Building", "Room", "Date", "Open Time", "Close Time")
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Flush the CSV buffer to the client once it grows past this many characters.
+CSV_CHUNK_SIZE = 64 * 1024
+# Excel's limit on sheet titles, and the characters it rejects in them.
+MAX_SHEET_TITLE = 31
+_INVALID_TITLE_CHARS = re.compile(r"[\[\]:*?/\\]")
+_COLUMN_WIDTHS = {"A": 18, "B": 10, "C": 12, "D": 11, "E": 11}
+
+
+def export_rows(batch_days: int):
+    """(building, room, date, open, close) for every occurrence, newest first, read ``batch_days`` at a time."""
+    snapshot = room_snapshot.current()
+    labels = {room.id: (room.building, room.number) for room in snapshot.rooms()}
+    for batch in occurrence_batches(batch_days, newest_first=True):
+        for room_id, day, open_time, close_time in batch:
+            if room_id in labels:
+                yield (*labels[room_id], day, open_time, close_time)
+
+
+def iter_csv(rows):
+    """Encode rows as CSV text chunks of roughly CSV_CHUNK_SIZE characters."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def sheet_title(name: str, taken: set[str]) -> str:
+    """A valid, unique worksheet title for ``name``."""
+    base = _INVALID_TITLE_CHARS.sub("-", name).strip("'") or "Sheet"
+    title = base[:MAX_SHEET_TITLE]
+    suffix = 2
+    while title.lower() in taken:
+        tail = f" ({suffix})"
+        title = base[:MAX_SHEET_TITLE - len(tail)] + tail
+        suffix += 1
+    taken.add(title.lower())
+    return title
+
+
+def _add_sheet(workbook: Workbook, title: str):
+    sheet = workbook.create_sheet(title)
+    for column, width in _COLUMN_WIDTHS.items():
+        sheet.column_dimensions[column].width = width
+    sheet.freeze_panes = "A2"
+    header = []
+    for label in EXPORT_HEADER:
+        cell = WriteOnlyCell(sheet, value=label)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+    return sheet
+
+
+def write_xlsx(rows, buildings=None, spool_size: int = 8 * 1024 * 1024) -> SpooledTemporaryFile:
+    """Write rows into a write-only workbook and return the file, rewound.
+
+    openpyxl's write-only mode streams each sheet's rows to a temporary file
+    instead of keeping cells in memory, and the finished workbook is saved to
+    a SpooledTemporaryFile that only moves to disk past ``spool_size`` bytes.
+    With ``buildings``, each of them gets its own sheet (in that order);
+    otherwise everything goes to a single "Schedules" sheet.
+    """
+    workbook = Workbook(write_only=True)
+    if buildings is None:
+        single = _add_sheet(workbook, "Schedules")
+        for row in rows:
+            single.append(row)
+    else:
+        taken: set[str] = set()
+        sheets = {building: _add_sheet(workbook, sheet_title(building, taken)) for building in buildings}
+        for row in rows:
+            sheet = sheets.get(row[0])
+            if sheet is None:
+                sheet = sheets[row[0]] = _add_sheet(workbook, sheet_title(row[0], taken))
+            sheet.append(row)
+
+    spool = SpooledTemporaryFile(max_size=spool_size)
+    workbook.save(spool)
+    spool.seek(0)
+    return spool
@@ -0,0 +1,167 @@
+import contextlib
+import os
+import pickle
+import re
+import secrets
+import time as _time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from . import db
+from .models import Room
+from .recurrence import occurrences
+from .schedule_parser import ParsedSheet
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+
+@dataclass
+class ImportPreview:
+    """A parsed-but-not-stored import, kept on disk until it is committed or expires."""
+
+    token: str
+    uploaded_by: str
+    files: list[tuple[str, str]]  # (saved path, display name)
+    sheets: list[ParsedSheet]
+    new_rooms: list[tuple[str, str]] = field(default_factory=list)
+    conflicts: list[dict] = field(default_factory=list)
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def usable_sheets(self) -> list[ParsedSheet]:
+        return [sheet for sheet in self.sheets if sheet.error is None]
+
+    @property
+    def rows(self) -> list[tuple]:
+        return [row for sheet in self.usable_sheets for row in sheet.rows]
+
+    @property
+    def rejected(self) -> list[tuple[str, int, str]]:
+        return [(sheet.label, line, reason) for sheet in self.usable_sheets for line, reason in sheet.rejected]
+
+
+def _overlaps(intervals: list[tuple]) -> list[tuple]:
+    """Pairs of overlapping (open, close, source) intervals, given sorted by open time."""
+    clashes = []
+    for i, (open_a, close_a, source_a) in enumerate(intervals):
+        for open_b, close_b, source_b in intervals[i + 1:]:
+            if open_b >= close_a:
+                break
+            if source_a == "existing" and source_b == "existing":
+                continue
+            clashes.append(((open_a, close_a, source_a), (open_b, close_b, source_b)))
+    return clashes
+
+
+def build_preview(token: str, uploaded_by: str, files, sheets: list[ParsedSheet]) -> ImportPreview:
+    """Work out which rooms would be created and which intervals would clash."""
+    preview = ImportPreview(token=token, uploaded_by=uploaded_by, files=files, sheets=sheets)
+    rows = preview.rows
+    if not rows:
+        return preview
+
+    labels = {(building, number) for building, number, *_ in rows}
+    buildings = {building for building, _ in labels}
+    dates = [row[2] for row in rows]
+
+    existing_rooms = {
+        room_id: (building, number)
+        for room_id, building, number in db.session.execute(
+            select(Room.id, Room.building, Room.number).where(Room.building.in_(buildings))
+        )
+    }
+    known_labels = set(existing_rooms.values())
+    preview.new_rooms = sorted(label for label in labels if label not in known_labels)
+
+    by_slot = defaultdict(list)
+    for building, number, day, open_time, close_time in rows:
+        by_slot[(building, number, day)].append((open_time, close_time, "file"))
+
+    # Existing one-off schedules and recurrence dates alike.
+    for room_id, day, open_time, close_time in occurrences(min(dates), max(dates), buildings=buildings):
+        building, number = existing_rooms[room_id]
+        if (building, number, day) in by_slot:
+            by_slot[(building, number, day)].append((open_time, close_time, "existing"))
+
+    for (building, number, day), intervals in sorted(by_slot.items()):
+        intervals.sort()
+        for first, second in _overlaps(intervals):
+            preview.conflicts.append({
+                "room": f"{building} {number}",
+                "date": day,
+                "first": first,
+                "second": second,
+            })
+    return preview
+
+
+def _preview_dir() -> str:
+    path = os.path.join(current_app.config["UPLOAD_FOLDER"], "previews")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _preview_path(token: str) -> str | None:
+    if not _TOKEN_RE.fullmatch(token or ""):
+        return None
+    return os.path.join(_preview_dir(), f"{token}.pickle")
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(18)
+
+
+def save_preview(preview: ImportPreview) -> None:
+    """Persist the parse result so any worker can render or commit it later."""
+    _expire_old_previews()
+    path = _preview_path(preview.token)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        pickle.dump(preview, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_preview(token: str) -> ImportPreview | None:
+    path = _preview_path(token)
+    if not path or not os.path.exists(path):
+        return None
+    if _time.time() - os.path.getmtime(path) > current_app.config["IMPORT_PREVIEW_TTL"]:
+        discard_preview(token)
+        return None
+    with open(path, "rb") as fh:
+        return pickle.load(fh)
+
+
+def claim_preview(token: str) -> ImportPreview | None:
+    """Load a preview for committing and remove it, so a double submit cannot import twice."""
+    preview = load_preview(token)
+    if preview is None:
+        return None
+    path = _preview_path(token)
+    claimed = f"{path}.{os.getpid()}.claimed"
+    try:
+        os.replace(path, claimed)
+    except FileNotFoundError:
+        return None
+    os.remove(claimed)
+    return preview
+
+
+def discard_preview(token: str) -> None:
+    path = _preview_path(token)
+    if path:
+        # A concurrent claim or expiry pass may remove it first.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _expire_old_previews() -> None:
+    cutoff = _time.time() - current_app.config["IMPORT_PREVIEW_TTL"]
+    for entry in os.scandir(_preview_dir()):
+        with contextlib.suppress(FileNotFoundError):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
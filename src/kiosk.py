@@ -0,0 +1,98 @@
+"""
+Compact per-building payloads for hallway kiosks.
+
+A kiosk fetches one full payload, keeps it in local storage and works out
+countdowns itself; after that it only asks what changed since its version
+token, which is normally nothing at all.
+"""
+from datetime import date
+
+from .changelog import changes_since, oldest_cursor
+from .snapshot import RoomSnapshot, room_snapshot
+
+# Past this many change-log rows a full payload is smaller than the delta.
+MAX_DELTA_CHANGES = 500
+
+
+def version_token(snapshot: RoomSnapshot) -> str:
+    """``<day>.<change-log cursor>``: today's intervals depend on the day, everything else on the cursor."""
+    return f"{snapshot.day.isoformat()}.{snapshot.cursor}"
+
+
+def parse_version(token: str | None) -> tuple[date, int] | None:
+    try:
+        day, cursor = (token or "").split(".")
+        return date.fromisoformat(day), int(cursor)
+    except ValueError:
+        return None
+
+
+def _room_entry(snapshot: RoomSnapshot, room) -> dict:
+    return {
+        "id": room.id,
+        "number": room.number,
+        "status": room.status,
+        "intervals": [list(interval) for interval in snapshot.interval_seconds(room.id)],
+    }
+
+
+def _delta(snapshot: RoomSnapshot, building: str, since: int) -> dict | None:
+    """Rooms of ``building`` changed after ``since``, or None when a full payload is needed.
+
+    Only room rows map straight onto kiosk entries; a schedule or recurrence
+    change may move any interval (and a deleted row no longer says which
+    room it was in), so those fall back to a full payload. ``removed`` lists
+    deleted rooms and rooms moved to another building; changes to rooms of
+    other buildings are left out.
+    """
+    if since < oldest_cursor():
+        return None
+    log = changes_since(since, MAX_DELTA_CHANGES + 1)
+    if len(log) > MAX_DELTA_CHANGES:
+        return None
+
+    room_ids, moved = [], set()
+    for entry_id, table, row_id, operation, _ in log:
+        if entry_id > snapshot.cursor:
+            break
+        if table in ("schedules", "recurrences"):
+            return None
+        if table == "rooms":
+            if row_id not in room_ids:
+                room_ids.append(row_id)
+            if operation == "move":
+                moved.add(row_id)
+
+    rooms, removed = [], []
+    for room_id in room_ids:
+        room = snapshot.room(room_id)
+        if room is None:
+            removed.append(room_id)
+        elif room.building == building:
+            rooms.append(_room_entry(snapshot, room))
+        elif room_id in moved:
+            # Moved away since ``since``; the log does not say from where, so
+            # kiosks of other buildings drop an id they never showed.
+            removed.append(room_id)
+    return {"rooms": rooms, "removed": removed}
+
+
+def kiosk_payload(building: str, since: str | None = None) -> dict | None:
+    """The kiosk view of one building: a delta against ``since`` when possible, else everything.
+
+    Intervals are ``[open, close]`` in seconds after midnight. Returns None
+    for a building with no rooms.
+    """
+    snapshot = room_snapshot.current()
+    version = version_token(snapshot)
+
+    known = parse_version(since)
+    if known is not None and known[0] == snapshot.day and known[1] <= snapshot.cursor:
+        delta = {"rooms": [], "removed": []} if known[1] == snapshot.cursor else _delta(snapshot, building, known[1])
+        if delta is not None:
+            return {"version": version, "full": False, **delta}
+
+    rooms = [_room_entry(snapshot, room) for room in snapshot.rooms() if room.building == building]
+    if not rooms:
+        return None
+    return {"version": version, "full": True, "building": building, "date": snapshot.day.isoformat(), "rooms": rooms}
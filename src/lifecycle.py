@@ -0,0 +1,75 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Lifecycle:
+    """Process-wide bookkeeping for graceful shutdown.
+
+    Long-running work (schedule imports) runs inside ``track()`` so a worker
+    that is asked to stop can mark itself as draining, fail readiness checks
+    and wait for that work to finish before the process exits.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._draining = False
+        self._drain_started: float | None = None
+        self._shutdown_hooks = []
+
+    @property
+    def draining(self) -> bool:
+        return self._draining
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextmanager
+    def track(self):
+        with self._cond:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def begin_drain(self):
+        if not self._draining:
+            self._drain_started = time.monotonic()
+        self._draining = True
+
+    def drain_remaining(self, budget: float) -> float:
+        """Seconds left of a ``budget`` that started counting when draining began."""
+        if self._drain_started is None:
+            return budget
+        return max(budget - (time.monotonic() - self._drain_started), 0.0)
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Block until no tracked work is running; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def on_shutdown(self, func):
+        """Register a callable to run (in registration order) when the process stops."""
+        self._shutdown_hooks.append(func)
+        return func
+
+    def shutdown(self, timeout: float | None = None) -> bool:
+        self.begin_drain()
+        idle = self.wait_idle(timeout)
+        for hook in self._shutdown_hooks:
+            hook()
+        return idle
+
+
+lifecycle = Lifecycle()
@@ -8,6 +8,11 @@ class Room(db.Model):
     building = db.Column(db.String(20), nullable=False)
     number = db.Column(db.String(10), nullable=False)
     status = db.Column(db.String(20), default="Available")
+    # Bumped on every write; ORM flushes check it, and the toggle endpoint
+    # updates with "WHERE version = ?" so concurrent clicks cannot both win.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def toggle_status(self):
         self.status = "Occupied" if self.status == "Available" else "Available"
@@ -22,6 +27,21 @@ class ScheduleImport(db.Model):
     upload_time = db.Column(db.DateTime, default=datetime.utcnow)
 
     schedules = db.relationship("Schedule", back_populates="import_record", cascade="all, delete-orphan")
+    files = db.relationship("ImportFile", back_populates="import_record", cascade="all, delete-orphan")
+    recurrences = db.relationship("Recurrence", back_populates="import_record", cascade="all, delete-orphan")
+
+
+class ImportFile(db.Model):
+    """An uploaded file behind a ScheduleImport, stored by content hash."""
+
+    __tablename__ = "import_files"
+
+    id = db.Column(db.Integer, primary_key=True)
+    import_id = db.Column(db.Integer, db.ForeignKey("schedule_imports.id"), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    blob_name = db.Column(db.String(80), nullable=False, index=True)
+
+    import_record = db.relationship("ScheduleImport", back_populates="files")
 
 
 class Schedule(db.Model):
@@ -38,6 +58,25 @@ class Schedule(db.Model):
     import_record = db.relationship("ScheduleImport", back_populates="schedules")
 
 
+class Recurrence(db.Model):
+    """A weekly slot (e.g. every Monday 09:00-11:00 for a term) stored once instead of per date."""
+
+    __tablename__ = "recurrences"
+
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey("rooms.id"), nullable=False, index=True)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday, as date.weekday()
+    open_time = db.Column(db.Time, nullable=False)
+    close_time = db.Column(db.Time, nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False, index=True)
+    exceptions = db.Column(db.Text, nullable=False, default="")  # comma-separated ISO dates skipped
+    import_id = db.Column(db.Integer, db.ForeignKey("schedule_imports.id"), index=True)
+
+    room = db.relationship("Room", backref=db.backref("recurrences", lazy=True, cascade="all, delete-orphan"))
+    import_record = db.relationship("ScheduleImport", back_populates="recurrences")
+
+
 class Issue(db.Model):
     __tablename__ = "issues"
 
@@ -49,3 +88,27 @@ class Issue(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     room = db.relationship("Room", backref=db.backref("issues", lazy=True))
+
+
+class ChangeLog(db.Model):
+    """Append-only record of row changes; ``id`` doubles as the sync cursor."""
+
+    __tablename__ = "change_log"
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(40), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AuditLog(db.Model):
+    __tablename__ = "audit_logs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(50), nullable=False, index=True)
+    entity_type = db.Column(db.String(40), nullable=False)
+    entity_id = db.Column(db.Integer)
+    actor = db.Column(db.String(120))
+    details = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
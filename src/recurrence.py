@@ -0,0 +1,177 @@
+"""
+Weekly recurring schedules: detected when a timetable is imported and
+expanded into concrete dates only when something reads them.
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, time, timedelta
+
+from sqlalchemy import func, select
+
+from . import db
+from .models import Recurrence, Room, Schedule
+
+# Fewer weekly repeats than this are stored as plain schedule rows.
+MIN_OCCURRENCES = 3
+# A series may skip this many weeks (holidays, exam week); a longer gap starts a new series.
+MAX_MISSING_WEEKS = 2
+
+WEEK = timedelta(days=7)
+
+
+@dataclass
+class Series:
+    """A detected weekly run of identical (room, open, close) rows."""
+
+    building: str
+    number: str
+    weekday: int
+    open_time: time
+    close_time: time
+    start_date: date
+    end_date: date
+    exceptions: list[date] = field(default_factory=list)
+    occurrences: int = 0
+
+
+def format_exceptions(days) -> str:
+    return ",".join(day.isoformat() for day in sorted(days))
+
+
+def parse_exceptions(value: str | None) -> set[date]:
+    return {date.fromisoformat(part) for part in (value or "").split(",") if part}
+
+
+def detect_series(rows: list[tuple]) -> tuple[list[Series], list[tuple]]:
+    """Split parsed (building, number, date, open, close) rows into weekly series and leftovers.
+
+    Leftover rows keep their input order, and a row repeated for the same
+    date is kept as a leftover so nothing in the file is lost.
+    """
+    dates_by_slot = defaultdict(set)
+    for building, number, day, open_time, close_time in rows:
+        dates_by_slot[(building, number, day.weekday(), open_time, close_time)].add(day)
+
+    series = []
+    covered = Counter()
+    max_gap = WEEK * (MAX_MISSING_WEEKS + 1)
+    for (building, number, weekday, open_time, close_time), dates in dates_by_slot.items():
+        runs = [[]]
+        for day in sorted(dates):
+            if runs[-1] and day - runs[-1][-1] > max_gap:
+                runs.append([])
+            runs[-1].append(day)
+
+        for run in runs:
+            if len(run) < MIN_OCCURRENCES:
+                continue
+            present = set(run)
+            missing = [
+                run[0] + WEEK * week
+                for week in range((run[-1] - run[0]).days // 7 + 1)
+                if run[0] + WEEK * week not in present
+            ]
+            series.append(Series(
+                building, number, weekday, open_time, close_time,
+                start_date=run[0], end_date=run[-1], exceptions=missing, occurrences=len(run),
+            ))
+            covered.update((building, number, day, open_time, close_time) for day in run)
+
+    leftovers = []
+    for row in rows:
+        if covered[row]:
+            covered[row] -= 1
+        else:
+            leftovers.append(row)
+    return series, leftovers
+
+
+def expand(weekday: int, start_date: date, end_date: date, exceptions: set[date],
+           start: date | None = None, end: date | None = None):
+    """Dates of one recurrence, optionally clipped to [start, end]."""
+    first = max(start_date, start) if start else start_date
+    last = min(end_date, end) if end else end_date
+    day = first + timedelta(days=(weekday - first.weekday()) % 7)
+    while day <= last:
+        if day not in exceptions:
+            yield day
+        day += WEEK
+
+
+def occurrences(start: date | None = None, end: date | None = None,
+                buildings=None, room_ids=None) -> list[tuple]:
+    """Every scheduled (room_id, date, open, close) in [start, end], one-off rows and recurrences alike.
+
+    Sorted by date, room and open time. Either bound may be None for an
+    open range.
+    """
+    schedule_stmt = select(Schedule.room_id, Schedule.date, Schedule.open_time, Schedule.close_time)
+    recurrence_stmt = select(
+        Recurrence.room_id, Recurrence.weekday, Recurrence.open_time, Recurrence.close_time,
+        Recurrence.start_date, Recurrence.end_date, Recurrence.exceptions,
+    )
+    if start is not None:
+        schedule_stmt = schedule_stmt.where(Schedule.date >= start)
+        recurrence_stmt = recurrence_stmt.where(Recurrence.end_date >= start)
+    if end is not None:
+        schedule_stmt = schedule_stmt.where(Schedule.date <= end)
+        recurrence_stmt = recurrence_stmt.where(Recurrence.start_date <= end)
+    if buildings is not None:
+        schedule_stmt = schedule_stmt.join(Room, Schedule.room_id == Room.id).where(Room.building.in_(buildings))
+        recurrence_stmt = recurrence_stmt.join(Room, Recurrence.room_id == Room.id).where(
+            Room.building.in_(buildings)
+        )
+    if room_ids is not None:
+        schedule_stmt = schedule_stmt.where(Schedule.room_id.in_(room_ids))
+        recurrence_stmt = recurrence_stmt.where(Recurrence.room_id.in_(room_ids))
+
+    result = [tuple(row) for row in db.session.execute(schedule_stmt)]
+    for room_id, weekday, open_time, close_time, start_date, end_date, skipped in db.session.execute(
+        recurrence_stmt
+    ):
+        result.extend(
+            (room_id, day, open_time, close_time)
+            for day in expand(weekday, start_date, end_date, parse_exceptions(skipped), start, end)
+        )
+    result.sort(key=lambda item: (item[1], item[0], item[2]))
+    return result
+
+
+def date_bounds() -> tuple[date, date] | None:
+    """First and last scheduled date over one-off rows and recurrences, or None when nothing is scheduled."""
+    schedule_first, schedule_last = db.session.execute(
+        select(func.min(Schedule.date), func.max(Schedule.date))
+    ).one()
+    series_first, series_last = db.session.execute(
+        select(func.min(Recurrence.start_date), func.max(Recurrence.end_date))
+    ).one()
+    firsts = [day for day in (schedule_first, series_first) if day is not None]
+    if not firsts:
+        return None
+    return min(firsts), max(day for day in (schedule_last, series_last) if day is not None)
+
+
+def occurrence_batches(batch_days: int = 31, newest_first: bool = False):
+    """Every occurrence, like ``occurrences()``, yielded as one list per ``batch_days`` window.
+
+    Only one window is held in memory at a time. With ``newest_first`` the
+    windows and the rows within them run backwards, giving exactly the
+    reverse of ``occurrences()``.
+    """
+    bounds = date_bounds()
+    if bounds is None:
+        return
+    first, last = bounds
+    step = timedelta(days=batch_days)
+    if newest_first:
+        end = last
+        while end >= first:
+            start = max(end - step + timedelta(days=1), first)
+            yield occurrences(start, end)[::-1]
+            end = start - timedelta(days=1)
+    else:
+        start = first
+        while start <= last:
+            end = min(start + step - timedelta(days=1), last)
+            yield occurrences(start, end)
+            start = end + timedelta(days=1)
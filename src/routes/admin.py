@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from .. import db
-from ..models import Room
+from ..audit import audit
+from ..models import AuditLog, Room
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -25,6 +26,7 @@ def add_room():
         new_room = Room(building=building, number=number, status=status)
         db.session.add(new_room)
         db.session.commit()
+        audit.record("room.create", "room", new_room.id, details=f"{building} {number} ({status})")
         
         flash(f"Room {building} {number} added successfully!", "success")
         return redirect(url_for("admin.manage_rooms"))
@@ -42,6 +44,10 @@ def edit_room(room_id):
         room.status = request.form.get("status", room.status)
         
         db.session.commit()
+        audit.record(
+            "room.update", "room", room.id,
+            details=f"{room.building} {room.number} ({room.status})",
+        )
         flash(f"Room {room.building} {room.number} updated successfully!", "success")
         return redirect(url_for("admin.manage_rooms"))
     
@@ -55,6 +61,20 @@ def delete_room(room_id):
     
     db.session.delete(room)
     db.session.commit()
+    audit.record("room.delete", "room", room_id, details=room_name)
     
     flash(f"Room {room_name} deleted successfully!", "success")
     return redirect(url_for("admin.manage_rooms"))
+
+@admin_bp.route("/audit")
+def audit_log():
+    """Paginated audit trail, newest first, optionally filtered by action"""
+    page = request.args.get("page", 1, type=int)
+    action = request.args.get("action") or None
+
+    query = AuditLog.query
+    if action:
+        query = query.filter_by(action=action)
+    entries = query.order_by(AuditLog.id.desc()).paginate(page=page, per_page=50, error_out=False)
+    actions = [a for (a,) in db.session.query(AuditLog.action).distinct().order_by(AuditLog.action)]
+    return render_template("admin/audit_log.html", entries=entries, actions=actions, action=action)
@@ -0,0 +1,339 @@
+import json
+from collections import defaultdict
+from datetime import date, datetime, time
+
+from flask import Blueprint, Response, request
+from sqlalchemy import select
+
+from .. import db
+from ..cache import cache
+from ..changelog import changes_since, latest_cursor, oldest_cursor
+from ..kiosk import kiosk_payload
+from ..models import Issue, Recurrence, Room, Schedule, ScheduleImport
+from ..recurrence import expand, parse_exceptions
+from ..snapshot import room_snapshot
+from ..timeline import parse_timeline_args, room_timeline
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH_IDS = 200
+MAX_CHANGES_PAGE = 1000
+
+# Public resources and the columns each one exposes, in output order.
+RESOURCES = {
+    "rooms": (Room, ("id", "building", "number", "status", "version")),
+    "schedules": (Schedule, ("id", "room_id", "date", "open_time", "close_time", "import_id")),
+    "recurrences": (Recurrence, (
+        "id", "room_id", "weekday", "open_time", "close_time", "start_date", "end_date", "exceptions", "import_id",
+    )),
+    "issues": (Issue, ("id", "room_id", "reporter_id", "description", "status", "created_at")),
+    "imports": (ScheduleImport, ("id", "filename", "uploaded_by", "upload_time")),
+}
+
+# The schedules list also returns every date of every recurrence, after the
+# one-off rows; those entries have no schedule id and name their recurrence.
+SCHEDULE_LIST_FIELDS = RESOURCES["schedules"][1] + ("recurrence_id",)
+
+
+def _resource_tags(resource: str, **_) -> tuple[str, ...]:
+    return ("schedules", "recurrences") if resource == "schedules" else (resource,)
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_response(payload, status: int = 200) -> Response:
+    body = json.dumps(payload, separators=(",", ":"), default=_json_default).encode("utf-8")
+    return Response(body, status=status, mimetype="application/json")
+
+
+@api_bp.errorhandler(ApiError)
+def _handle_api_error(exc: ApiError):
+    return _json_response({"error": exc.message, **exc.extra}, status=exc.status)
+
+
+def _resolve_resource(name: str):
+    if name not in RESOURCES:
+        raise ApiError(f"Unknown resource '{name}'.", status=404)
+    return RESOURCES[name]
+
+
+def _selected_fields(available: tuple[str, ...]) -> tuple[str, ...]:
+    """Apply the ?fields= sparse fieldset; the id column is always included."""
+    raw = request.args.get("fields")
+    if not raw:
+        return available
+    requested = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in available]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}.")
+    return ("id",) + tuple(f for f in available if f in requested and f != "id")
+
+
+def _int_arg(name: str, default: int | None = None) -> int | None:
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ApiError(f"'{name}' must be an integer.")
+
+
+def _date_arg(name: str) -> date | None:
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise ApiError(f"'{name}' must be a date (YYYY-MM-DD).")
+
+
+def _id_list() -> list[int] | None:
+    raw = request.args.get("ids")
+    if not raw:
+        return None
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise ApiError("'ids' must be a comma-separated list of integers.")
+    if len(ids) > MAX_BATCH_IDS:
+        raise ApiError(f"At most {MAX_BATCH_IDS} ids can be fetched at once.")
+    return ids
+
+
+def _fetch_rows(model, fields, *criteria, limit=None):
+    """Run a column-only select and return plain tuples (no ORM identity map)."""
+    stmt = select(*(getattr(model, f) for f in fields)).where(*criteria).order_by(model.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.session.execute(stmt).all()
+
+
+def _load_rows(model, fields, ids=None, after=None, limit=None):
+    """Rows by id list or id cursor; rooms come from the in-memory snapshot."""
+    if model is Room:
+        return room_snapshot.current().select(fields, ids=ids, after=after, limit=limit)
+    criteria = []
+    if ids is not None:
+        criteria.append(model.id.in_(ids))
+    if after is not None:
+        criteria.append(model.id > after)
+    return _fetch_rows(model, fields, *criteria, limit=limit)
+
+
+def _parse_schedule_cursor(raw: str | None) -> tuple[int, int, date | None]:
+    """(last schedule id, last recurrence id, last date of that recurrence) from a schedules cursor.
+
+    Plain integers are schedule ids, as for every other resource; once the
+    one-off rows are exhausted the cursor becomes ``r<recurrence id>:<date>``.
+    """
+    if not raw:
+        return 0, 0, None
+    try:
+        if raw.startswith("r"):
+            recurrence_id, day = raw[1:].split(":")
+            return 0, int(recurrence_id), date.fromisoformat(day)
+        return int(raw), 0, None
+    except ValueError:
+        raise ApiError("'cursor' is not a valid schedules cursor.")
+
+
+def _schedule_page(fields, limit: int, start: date | None, end: date | None):
+    """One page of one-off rows followed by recurrence dates, clipped to [start, end]; rows and next cursor."""
+    after_id, after_recurrence, after_day = _parse_schedule_cursor(request.args.get("cursor"))
+    entries = []
+    if not after_recurrence:
+        criteria = [Schedule.id > after_id]
+        if start is not None:
+            criteria.append(Schedule.date >= start)
+        if end is not None:
+            criteria.append(Schedule.date <= end)
+        columns = RESOURCES["schedules"][1]
+        entries = [
+            (row[0], {**dict(zip(columns, row)), "recurrence_id": None})
+            for row in _fetch_rows(Schedule, columns, *criteria, limit=limit + 1)
+        ]
+
+    if len(entries) <= limit:
+        stmt = select(
+            Recurrence.id, Recurrence.room_id, Recurrence.weekday, Recurrence.open_time, Recurrence.close_time,
+            Recurrence.start_date, Recurrence.end_date, Recurrence.exceptions, Recurrence.import_id,
+        ).where(Recurrence.id >= after_recurrence).order_by(Recurrence.id)
+        if start is not None:
+            stmt = stmt.where(Recurrence.end_date >= start)
+        if end is not None:
+            stmt = stmt.where(Recurrence.start_date <= end)
+        for recurrence_id, room_id, weekday, open_time, close_time, first, last, skipped, import_id in (
+            db.session.execute(stmt.execution_options(yield_per=100))
+        ):
+            for day in expand(weekday, first, last, parse_exceptions(skipped), start, end):
+                if recurrence_id == after_recurrence and day <= after_day:
+                    continue
+                entries.append((f"r{recurrence_id}:{day.isoformat()}", {
+                    "id": None, "room_id": room_id, "date": day, "open_time": open_time,
+                    "close_time": close_time, "import_id": import_id, "recurrence_id": recurrence_id,
+                }))
+                if len(entries) > limit:
+                    break
+            if len(entries) > limit:
+                break
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    rows = [tuple(values[f] for f in fields) for _, values in entries]
+    return rows, entries[-1][0] if has_more else None
+
+
+def _shape(fields, rows):
+    if request.args.get("shape") == "rows":
+        return {"fields": list(fields), "rows": [list(r) for r in rows]}
+    return {"data": [dict(zip(fields, r)) for r in rows]}
+
+
+@api_bp.route("/<resource>")
+@cache.cached_view(ttl="api", tags=_resource_tags)
+def list_resource(resource: str):
+    """Rows of one resource, by ``ids`` or in pages with ``limit`` and ``cursor``.
+
+    Schedules list every scheduled date, recurring ones included (see
+    SCHEDULE_LIST_FIELDS), and take optional ``from`` and ``to`` dates.
+    """
+    model, available = _resolve_resource(resource)
+    ids = _id_list()
+    if ids is not None:
+        fields = _selected_fields(available)
+        rows = _load_rows(model, fields, ids=ids)
+        return _json_response(_shape(fields, rows))
+
+    limit = min(max(_int_arg("limit", DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    if model is Schedule:
+        fields = _selected_fields(SCHEDULE_LIST_FIELDS)
+        rows, next_cursor = _schedule_page(fields, limit, _date_arg("from"), _date_arg("to"))
+        payload = _shape(fields, rows)
+        payload["next_cursor"] = next_cursor
+        return _json_response(payload)
+
+    fields = _selected_fields(available)
+    rows = _load_rows(model, fields, after=_int_arg("cursor"), limit=limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    payload = _shape(fields, rows)
+    payload["next_cursor"] = rows[-1][0] if has_more else None
+    return _json_response(payload)
+
+
+@api_bp.route("/<resource>/<int:item_id>")
+@cache.cached_view(ttl="api", tags=_resource_tags)
+def get_resource(resource: str, item_id: int):
+    model, available = _resolve_resource(resource)
+    fields = _selected_fields(available)
+    rows = _load_rows(model, fields, ids=[item_id])
+    if not rows:
+        raise ApiError(f"{resource} {item_id} not found.", status=404)
+    return _json_response({"data": dict(zip(fields, rows[0]))})
+
+
+@api_bp.route("/timeline")
+def timeline():
+    building, start, span = parse_timeline_args(request.args)
+    if not building:
+        raise ApiError("'building' is required.")
+    days = room_timeline(building, start, 7 if span == "week" else 1)
+    return _json_response({"data": days})
+
+
+@api_bp.route("/kiosk/<building>")
+def kiosk(building):
+    """Room states and today's intervals for one building; pass ``since`` to get only what changed."""
+    payload = kiosk_payload(building, request.args.get("since"))
+    if payload is None:
+        raise ApiError(f"Unknown building '{building}'.", status=404)
+    response = _json_response(payload)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@api_bp.route("/cache")
+def cache_metrics():
+    """Hit/miss counters of this worker's cache."""
+    return _json_response({"data": cache.metrics()})
+
+
+@api_bp.route("/changes")
+def changes():
+    """Incremental sync feed: every row touched after ``since``, newest state only.
+
+    A cursor older than the pruned part of the log gets 410 with the
+    ``latest_cursor``; the client must re-read the resources it mirrors and
+    continue from that cursor.
+    The cursor is the log's autoincrement id, see ``changes_since`` for how
+    late commits can skip ids when several writers run on PostgreSQL.
+    """
+    since = max(_int_arg("since", 0), 0)
+    if since < oldest_cursor():
+        raise ApiError(
+            f"Changes after cursor {since} have been pruned; resync from a full read.",
+            status=410, latest_cursor=latest_cursor(),
+        )
+    limit = min(max(_int_arg("limit", MAX_CHANGES_PAGE), 1), MAX_CHANGES_PAGE)
+
+    log = changes_since(since, limit + 1)
+    has_more = len(log) > limit
+    log = log[:limit]
+
+    # Collapse repeated changes to a row down to its last operation.
+    latest = {}
+    for entry_id, table, row_id, operation, changed_at in log:
+        latest[(table, row_id)] = (entry_id, operation, changed_at)
+
+    live_ids = defaultdict(list)
+    for (table, row_id), (_, operation, _) in latest.items():
+        if operation != "delete":
+            live_ids[table].append(row_id)
+
+    current = {}
+    for table, ids in live_ids.items():
+        model, fields = RESOURCES[table]
+        for row in _load_rows(model, fields, ids=ids):
+            current[(table, row[0])] = dict(zip(fields, row))
+
+    items = []
+    for (table, row_id), (entry_id, operation, changed_at) in sorted(latest.items(), key=lambda kv: kv[1][0]):
+        data = current.get((table, row_id))
+        if data is None:
+            # Deleted again later in the log; report the final state.
+            operation = "delete"
+        elif operation == "move":
+            # A room moved to another building; the feed's data already shows where.
+            operation = "update"
+        items.append({
+            "cursor": entry_id,
+            "table": table,
+            "id": row_id,
+            "op": operation,
+            "at": changed_at,
+            "data": data,
+        })
+
+    return _json_response({
+        "changes": items,
+        # A cursor past the end of the log is not echoed back; it would skip the next writes.
+        "next_cursor": log[-1][0] if log else min(since, latest_cursor()),
+        "has_more": has_more,
+    })
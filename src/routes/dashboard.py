@@ -1,44 +1,39 @@
-from flask import Blueprint, render_template, make_response
-from ..models import Room, Schedule  # <--- Added Schedule
-import csv
-import io
-from flask import make_response
+from flask import Blueprint, Response, current_app, render_template, request, send_file, stream_with_context
+from ..export import XLSX_MIMETYPE, export_rows, iter_csv, write_xlsx
+from ..snapshot import room_snapshot
+from ..summary import building_summary
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
 @dashboard_bp.route("/")
 @dashboard_bp.route("/dashboard")
 def dashboard():
-    rooms = Room.query.order_by(Room.building.asc(), Room.number.asc()).all()
-    return render_template("dashboard.html", rooms=rooms)
-
-# --- PASTE AT THE BOTTOM OF src/routes/dashboard.py ---
+    # Plain tuples from the in-memory snapshot; no ORM objects per room.
+    snapshot = room_snapshot.current()
+    return render_template(
+        "dashboard.html", rooms=snapshot.rooms(), snapshot=snapshot, summary=building_summary()
+    )
 
 @dashboard_bp.route('/export/schedules')
 def export_schedules():
-    # 1. Setup CSV in memory
-    si = io.StringIO()
-    cw = csv.writer(si)
-    
-    # 2. Write Header Row
-    cw.writerow(['Building', 'Room', 'Date', 'Open Time', 'Close Time'])
+    """Every schedule, newest first, as CSV or (``?format=xlsx``) an Excel workbook.
 
-    # 3. Query Real Data from Database
-    # We join with Room to ensure we only get valid schedules and order by date
-    schedules = Schedule.query.join(Room).order_by(Schedule.date.desc()).all()
+    ``sheets=building`` splits the workbook into one sheet per building.
+    Rows are read a batch of days at a time and never held all at once.
+    """
+    rows = export_rows(current_app.config["EXPORT_BATCH_DAYS"])
 
-    # 4. Loop through and write rows
-    for s in schedules:
-        cw.writerow([
-            s.room.building,       # From Room model
-            s.room.number,         # From Room model
-            s.date,                # From Schedule model
-            s.open_time,           # From Schedule model
-            s.close_time           # From Schedule model
-        ])
+    if request.args.get("format") == "xlsx":
+        buildings = None
+        if request.args.get("sheets") == "building":
+            buildings = sorted({room.building for room in room_snapshot.current().rooms()})
+        workbook = write_xlsx(rows, buildings, spool_size=current_app.config["EXPORT_SPOOL_MAX_SIZE"])
+        return send_file(
+            workbook, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name="schedule_export.xlsx"
+        )
 
-    # 5. Create Response
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=schedule_export.csv"
-    output.headers["Content-type"] = "text/csv"
-    return output
\ No newline at end of file
+    return Response(
+        stream_with_context(iter_csv(rows)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=schedule_export.csv"},
+    )
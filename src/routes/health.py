@@ -0,0 +1,26 @@
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+
+from .. import db
+from ..lifecycle import lifecycle
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/healthz")
+def healthz():
+    """Liveness: the worker is up and answering requests."""
+    return jsonify(status="ok")
+
+
+@health_bp.route("/readyz")
+def readyz():
+    """Readiness: the worker can reach the database and is not shutting down."""
+    if lifecycle.draining:
+        return jsonify(status="draining", in_flight=lifecycle.in_flight), 503
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as exc:
+        current_app.logger.warning("Readiness check failed: %s", exc)
+        return jsonify(status="unavailable", reason="database"), 503
+    return jsonify(status="ready")
@@ -1,14 +1,30 @@
 import os
 from datetime import datetime
 
-import pandas as pd
 from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+from sqlalchemy import delete, insert, select
 from werkzeug.utils import secure_filename
 
 from .. import db
-from ..models import Room, Schedule, ScheduleImport
+from ..audit import audit
+from ..changelog import note_tags, record_changes, schedule_day_tag
+from ..import_preview import (
+    build_preview,
+    claim_preview,
+    discard_preview,
+    load_preview,
+    new_token,
+    save_preview,
+)
+from ..lifecycle import lifecycle
+from ..models import ImportFile, Recurrence, Room, Schedule, ScheduleImport
+from ..recurrence import Series, detect_series, format_exceptions
+from ..schedule_parser import parse_files, shutdown_pool
+from ..status_scheduler import status_scheduler
+from ..storage import blob_path, store_upload
 
 imports_bp = Blueprint("imports", __name__)
+lifecycle.on_shutdown(shutdown_pool)
 
 
 def _allowed_file(filename: str | None) -> bool:
@@ -18,113 +34,270 @@ def _allowed_file(filename: str | None) -> bool:
     return ext in current_app.config.get("ALLOWED_EXTENSIONS", set())
 
 
-def _split_room_label(label: str | None) -> tuple[str | None, str | None]:
-    label = (label or "").strip()
-    if not label:
-        return None, None
-    parts = label.split(None, 1)
-    building = parts[0]
-    number = parts[1] if len(parts) > 1 else "000"
-    return building, number
-
-
-def _read_schedule_dataframe(file_path: str) -> pd.DataFrame:
-    if file_path.lower().endswith(".csv"):
-        return pd.read_csv(file_path)
-    return pd.read_excel(file_path)
-
-
-def _parse_date(value):
-    if pd.isna(value):
-        return None
-    try:
-        return pd.to_datetime(value).date()
-    except Exception:
-        return None
-
-
-def _parse_time(value):
-    if pd.isna(value):
-        return None
-    try:
-        return pd.to_datetime(value).time()
-    except Exception:
-        return None
-
-
 @imports_bp.route("/import", methods=["GET", "POST"])
 def import_schedule():
     recent_imports = ScheduleImport.query.order_by(ScheduleImport.upload_time.desc()).limit(5).all()
 
     if request.method == "POST":
-        file = request.files.get("schedule_file")
+        files = [f for f in request.files.getlist("schedule_file") if f and f.filename]
         uploaded_by = request.form.get("uploaded_by") or "Unknown"
 
-        if not file or file.filename == "":
+        if not files:
             flash("Please choose a schedule file before submitting.", "error")
             return redirect(url_for("imports.import_schedule"))
 
-        if not _allowed_file(file.filename):
+        if not all(_allowed_file(f.filename) for f in files):
             flash("Only .csv and .xlsx schedule files are supported right now.", "error")
             return redirect(url_for("imports.import_schedule"))
 
-        safe_name = secure_filename(file.filename or "")
-        timestamp_prefix = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        stored_name = f"{timestamp_prefix}_{safe_name}"
-        save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], stored_name)
-        file.save(save_path)
-
-        try:
-            df = _read_schedule_dataframe(save_path)
-        except Exception as exc:
-            current_app.logger.exception("Failed to read schedule file: %s", exc)
-            flash("Could not read that file. Please confirm it opens in Excel first.", "error")
+        if lifecycle.draining:
+            flash("The server is restarting. Please upload again in a moment.", "error")
             return redirect(url_for("imports.import_schedule"))
 
-        required_cols = {"Room", "Date", "OpenTime", "CloseTime"}
-        if not required_cols.issubset(df.columns):
-            flash("File must include columns: Room, Date, OpenTime, CloseTime.", "error")
-            return redirect(url_for("imports.import_schedule"))
+        with lifecycle.track():
+            return _run_import(files, uploaded_by, dry_run=bool(request.form.get("dry_run")))
 
-        import_record = ScheduleImport(filename=safe_name, uploaded_by=uploaded_by)
-        db.session.add(import_record)
+    return render_template("import.html", recent_imports=recent_imports)
+
+
+def _save_upload(file) -> tuple[str, str]:
+    safe_name = secure_filename(file.filename or "")
+    blob_name = store_upload(file, safe_name)
+    return blob_path(blob_name), safe_name
+
+
+def _room_ids(labels: set[tuple[str, str]]) -> dict[tuple[str, str], int]:
+    """Map (building, number) to room id, creating any rooms that do not exist yet."""
+    room_ids = {}
+    buildings = {building for building, _ in labels}
+    if buildings:
+        existing = db.session.execute(
+            select(Room.building, Room.number, Room.id).where(Room.building.in_(buildings))
+        )
+        room_ids = {(b, n): room_id for b, n, room_id in existing if (b, n) in labels}
+
+    missing = [label for label in labels if label not in room_ids]
+    for building, number in missing:
+        room = Room(building=building, number=number)
+        db.session.add(room)
+        room_ids[(building, number)] = room
+    if missing:
         db.session.flush()
+        for label in missing:
+            room_ids[label] = room_ids[label].id
+    return room_ids
+
+
+def _persist_rows(import_record: ScheduleImport, rows: list[tuple]) -> tuple[list[Series], int]:
+    """Store parsed (building, number, date, open, close) rows.
+
+    Returns the weekly series found and the number of schedule rows stored.
+
+    Weekly runs become one Recurrence each; the remaining rows are inserted
+    as individual schedules.
+    """
+    series, singles = detect_series(rows)
+    room_ids = _room_ids({(building, number) for building, number, *_ in rows})
+
+    if series:
+        recurrence_ids = db.session.scalars(
+            insert(Recurrence).returning(Recurrence.id),
+            [
+                {
+                    "room_id": room_ids[(item.building, item.number)],
+                    "weekday": item.weekday,
+                    "open_time": item.open_time,
+                    "close_time": item.close_time,
+                    "start_date": item.start_date,
+                    "end_date": item.end_date,
+                    "exceptions": format_exceptions(item.exceptions),
+                    "import_id": import_record.id,
+                }
+                for item in series
+            ],
+        ).all()
+        record_changes(db.session, "recurrences", recurrence_ids, "insert")
 
-        created_rows = 0
-        skipped_rows = 0
-
-        for _, row in df.iterrows():
-            building, number = _split_room_label(row.get("Room"))
-            date_value = _parse_date(row.get("Date"))
-            open_time = _parse_time(row.get("OpenTime"))
-            close_time = _parse_time(row.get("CloseTime"))
-
-            if not (building and number and date_value and open_time and close_time):
-                skipped_rows += 1
-                continue
-
-            room = Room.query.filter_by(building=building, number=number).first()
-            if not room:
-                room = Room(building=building, number=number)
-                db.session.add(room)
-                db.session.flush()
-
-            schedule_entry = Schedule(
-                room_id=room.id,
-                date=date_value,
-                open_time=open_time,
-                close_time=close_time,
-                import_id=import_record.id,
-            )
-            db.session.add(schedule_entry)
-            created_rows += 1
-
-        db.session.commit()
-
-        message = f"Imported {created_rows} schedule rows"
-        if skipped_rows:
-            message += f" (skipped {skipped_rows} incomplete rows)"
-        flash(message + ".", "success")
+    values = [
+        {
+            "room_id": room_ids[(building, number)],
+            "date": date_value,
+            "open_time": open_time,
+            "close_time": close_time,
+            "import_id": import_record.id,
+        }
+        for building, number, date_value, open_time, close_time in singles
+    ]
+    if values:
+        # One executemany instead of an ORM object (and flush bookkeeping) per row.
+        ids = db.session.scalars(insert(Schedule).returning(Schedule.id), values).all()
+        days = {row[2] for row in singles}
+        record_changes(db.session, "schedules", ids, "insert", tags=map(schedule_day_tag, days))
+    return series, len(singles)
+
+
+def _usable_or_flash(sheets) -> bool:
+    """Log unreadable sheets; flash an error and return False when nothing is importable."""
+    for sheet in sheets:
+        if sheet.error:
+            current_app.logger.warning("Skipping %s: %s", sheet.label, sheet.error)
+    if any(sheet.error is None for sheet in sheets):
+        return True
+    if any(sheet.error.startswith("missing columns") for sheet in sheets):
+        flash("File must include columns: Room, Date, OpenTime, CloseTime.", "error")
+    else:
+        flash("Could not read that file. Please confirm it opens in Excel first.", "error")
+    return False
+
+
+def _run_import(files, uploaded_by: str, dry_run: bool = False):
+    saved = [_save_upload(file) for file in files]
+    sheets = parse_files(saved, max_workers=current_app.config["IMPORT_MAX_WORKERS"])
+    if not _usable_or_flash(sheets):
         return redirect(url_for("imports.import_schedule"))
 
-    return render_template("import.html", recent_imports=recent_imports)
+    if dry_run:
+        preview = build_preview(new_token(), uploaded_by, saved, sheets)
+        save_preview(preview)
+        return redirect(url_for("imports.preview_import", token=preview.token))
+
+    return _commit_import(saved, sheets, uploaded_by)
+
+
+def _remove_import_rows(import_record: ScheduleImport) -> None:
+    """Delete the schedules and recurrences an earlier import created."""
+    recurrence_ids = db.session.execute(
+        select(Recurrence.id).where(Recurrence.import_id == import_record.id)
+    ).scalars().all()
+    if recurrence_ids:
+        db.session.execute(delete(Recurrence).where(Recurrence.import_id == import_record.id))
+        record_changes(db.session, "recurrences", recurrence_ids, "delete")
+
+    existing = db.session.execute(
+        select(Schedule.id, Schedule.date).where(Schedule.import_id == import_record.id)
+    ).all()
+    if existing:
+        db.session.execute(delete(Schedule).where(Schedule.import_id == import_record.id))
+        record_changes(
+            db.session, "schedules", [row_id for row_id, _ in existing], "delete",
+            tags={schedule_day_tag(day) for _, day in existing},
+        )
+
+
+def _commit_import(saved, sheets, uploaded_by: str, replaces: ScheduleImport | None = None):
+    usable = [sheet for sheet in sheets if sheet.error is None]
+    filenames = ", ".join(name for _, name in saved)
+    if replaces is not None:
+        # A rerun replaces the rows of the original record in place, so the
+        # import history keeps one entry per file set.
+        _remove_import_rows(replaces)
+        import_record = replaces
+        import_record.uploaded_by = uploaded_by
+        import_record.upload_time = datetime.utcnow()
+    else:
+        import_record = ScheduleImport(filename=filenames[:255], uploaded_by=uploaded_by)
+        import_record.files = [
+            ImportFile(filename=name, blob_name=os.path.basename(path)) for path, name in saved
+        ]
+        db.session.add(import_record)
+    db.session.flush()
+
+    rows = [row for sheet in usable for row in sheet.rows]
+    skipped_rows = sum(sheet.skipped for sheet in usable)
+    series, created_rows = _persist_rows(import_record, rows)
+
+    # Import records are not a change-log table, so their cache tag is bumped here.
+    note_tags(db.session, {"imports"})
+    db.session.commit()
+    status_scheduler.wake()
+    details = f"{filenames}: {created_rows} rows"
+    if series:
+        details += f" and {len(series)} weekly series ({len(rows)} dated sessions)"
+    details += f" from {len(usable)} sheet(s), {skipped_rows} skipped"
+    audit.record(
+        "schedule.rerun" if replaces is not None else "schedule.import",
+        "schedule_import", import_record.id, actor=uploaded_by, details=details,
+    )
+
+    message = f"Imported {created_rows} schedule rows"
+    if series:
+        message += f" and {len(series)} weekly series"
+    if len(usable) > 1:
+        message += f" from {len(usable)} sheets"
+    if series:
+        message += f" ({len(rows)} dated sessions)"
+    if skipped_rows:
+        message += f" (skipped {skipped_rows} incomplete rows)"
+    ignored = len(sheets) - len(usable)
+    if ignored:
+        message += f"; ignored {ignored} unreadable sheet(s)"
+    flash(message + ".", "success")
+    return redirect(url_for("imports.import_schedule"))
+
+
+@imports_bp.route("/import/<int:import_id>/rerun", methods=["POST"])
+def rerun_import(import_id: int):
+    """Parse an earlier import again from its stored files and replace its schedules in place."""
+    original = ScheduleImport.query.get_or_404(import_id)
+    stored = [(blob_path(f.blob_name), f.filename) for f in original.files]
+    if not stored or not all(os.path.exists(path) for path, _ in stored):
+        flash("The original files for that import are no longer stored.", "error")
+        return redirect(url_for("imports.import_schedule"))
+
+    if lifecycle.draining:
+        flash("The server is restarting. Please upload again in a moment.", "error")
+        return redirect(url_for("imports.import_schedule"))
+
+    with lifecycle.track():
+        sheets = parse_files(stored, max_workers=current_app.config["IMPORT_MAX_WORKERS"])
+        if not _usable_or_flash(sheets):
+            return redirect(url_for("imports.import_schedule"))
+        uploaded_by = request.form.get("uploaded_by") or original.uploaded_by or "Unknown"
+        return _commit_import(stored, sheets, uploaded_by, replaces=original)
+
+
+PREVIEW_PAGE_SIZE = 50
+
+
+@imports_bp.route("/import/preview/<token>")
+def preview_import(token: str):
+    preview = load_preview(token)
+    if preview is None:
+        flash("That preview has expired. Please upload the file again.", "error")
+        return redirect(url_for("imports.import_schedule"))
+
+    rows = preview.rows
+    page = max(request.args.get("page", 1, type=int), 1)
+    pages = max((len(rows) + PREVIEW_PAGE_SIZE - 1) // PREVIEW_PAGE_SIZE, 1)
+    page = min(page, pages)
+    page_rows = rows[(page - 1) * PREVIEW_PAGE_SIZE:page * PREVIEW_PAGE_SIZE]
+    return render_template(
+        "import_preview.html",
+        preview=preview,
+        total_rows=len(rows),
+        rows=page_rows,
+        page=page,
+        pages=pages,
+    )
+
+
+@imports_bp.route("/import/preview/<token>/commit", methods=["POST"])
+def commit_preview(token: str):
+    if lifecycle.draining:
+        flash("The server is restarting. Please upload again in a moment.", "error")
+        return redirect(url_for("imports.preview_import", token=token))
+
+    preview = claim_preview(token)
+    if preview is None:
+        flash("That preview has expired or was already imported.", "error")
+        return redirect(url_for("imports.import_schedule"))
+
+    with lifecycle.track():
+        return _commit_import(preview.files, preview.sheets, preview.uploaded_by)
+
+
+@imports_bp.route("/import/preview/<token>/discard", methods=["POST"])
+def discard_import_preview(token: str):
+    discard_preview(token)
+    flash("Preview discarded; nothing was imported.", "success")
+    return redirect(url_for("imports.import_schedule"))
@@ -1,7 +1,9 @@
 from flask import Blueprint, flash, redirect, render_template, request, url_for
 
 from .. import db
+from ..audit import audit
 from ..models import Issue, Room
+from ..search import search_issues
 
 issues_bp = Blueprint("issues", __name__)
 
@@ -26,6 +28,7 @@ def report_issue():
         )
         db.session.add(new_issue)
         db.session.commit()
+        audit.record("issue.report", "issue", new_issue.id, actor=reporter_id or None)
 
         flash("Issue reported. We set the status to New for follow-up.", "success")
         return redirect(url_for("issues.list_issues"))
@@ -33,10 +36,26 @@ def report_issue():
     return render_template("issue_report.html", rooms=rooms)
 
 
+SEARCH_PAGE_SIZE = 20
+
+
 @issues_bp.route("/issues")
 def list_issues():
-    issues = Issue.query.order_by(Issue.created_at.desc()).all()
-    return render_template("issues_list.html", issues=issues)
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        issues = Issue.query.order_by(Issue.created_at.desc()).all()
+        return render_template("issues_list.html", issues=issues, query="")
+
+    page = request.args.get("page", 1, type=int)
+    issues, total = search_issues(query, page=page, per_page=SEARCH_PAGE_SIZE)
+    return render_template(
+        "issues_list.html",
+        issues=issues,
+        query=query,
+        page=page,
+        total=total,
+        has_next=page * SEARCH_PAGE_SIZE < total,
+    )
 
 
 @issues_bp.route("/issues/<int:issue_id>/resolve", methods=["POST"])
@@ -44,5 +63,6 @@ def resolve_issue(issue_id: int):
     issue = Issue.query.get_or_404(issue_id)
     issue.status = "Resolved"
     db.session.commit()
+    audit.record("issue.resolve", "issue", issue.id)
     flash("Issue marked as resolved.", "success")
     return redirect(url_for("issues.list_issues"))
@@ -1,12 +1,100 @@
-from flask import Blueprint, redirect, url_for
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, url_for
+from sqlalchemy import case, select, update
+
 from .. import db
+from ..audit import audit
+from ..changelog import record_changes
 from ..models import Room
+from ..timeline import DAY_END_MINUTES, DAY_START_MINUTES, parse_timeline_args, room_timeline
 
 rooms_bp = Blueprint("rooms", __name__)
 
-@rooms_bp.route("/rooms/<int:room_id>/toggle")
+
+def _wants_json() -> bool:
+    return request.is_json or request.accept_mimetypes.best == "application/json"
+
+
+def _toggle_reply(body: dict, status: int = 200, message: str | None = None):
+    if _wants_json():
+        return jsonify(body), status
+    if message:
+        flash(message, "error")
+    return redirect(url_for("dashboard.dashboard"))
+
+
+@rooms_bp.route("/rooms/<int:room_id>/toggle", methods=["POST"])
 def toggle(room_id):
-    room = Room.query.get_or_404(room_id)
-    room.toggle_status()
+    """Flip a room's status if it is still at the version the caller saw.
+
+    ``version`` comes from the JSON body or form; without it the current
+    version is used. The flip is a single conditional UPDATE, so of two
+    concurrent toggles one wins and the other gets a 409 at once.
+    """
+    payload = request.get_json(silent=True) or request.form
+    try:
+        expected = int(payload["version"]) if payload.get("version") not in (None, "") else None
+    except (TypeError, ValueError):
+        return _toggle_reply({"error": "'version' must be an integer."}, 400, "Invalid room version.")
+
+    if expected is None:
+        expected = db.session.execute(select(Room.version).where(Room.id == room_id)).scalar()
+        if expected is None:
+            abort(404)
+
+    flipped = case((Room.status == "Available", "Occupied"), else_="Available")
+    updated = db.session.execute(
+        update(Room)
+        .where(Room.id == room_id, Room.version == expected)
+        .values(status=flipped, version=Room.version + 1)
+        .returning(Room.status, Room.version)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if updated is None:
+        db.session.rollback()
+        current = db.session.execute(
+            select(Room.building, Room.number, Room.status, Room.version).where(Room.id == room_id)
+        ).first()
+        if current is None:
+            abort(404)
+        return _toggle_reply(
+            {"error": "Room was changed by someone else.", "id": room_id,
+             "status": current.status, "version": current.version},
+            409,
+            f"Room {current.building} {current.number} was changed by someone else; "
+            f"it is now {current.status}.",
+        )
+
+    status, version = updated
+    record_changes(db.session, "rooms", [room_id])
     db.session.commit()
-    return redirect(url_for("dashboard.dashboard"))
+    audit.record("room.toggle", "room", room_id, details=f"status -> {status}")
+    return _toggle_reply({"id": room_id, "status": status, "version": version})
+
+
+@rooms_bp.route("/rooms/timeline")
+def timeline():
+    buildings = [b for (b,) in db.session.query(Room.building).distinct().order_by(Room.building)]
+    building, start, span = parse_timeline_args(request.args)
+    if building not in buildings:
+        building = buildings[0] if buildings else None
+
+    days = room_timeline(building, start, 7 if span == "week" else 1) if building else []
+    hours = range(DAY_START_MINUTES // 60, DAY_END_MINUTES // 60)
+    return render_template(
+        "timeline.html",
+        buildings=buildings,
+        building=building,
+        start=start,
+        span=span,
+        days=days,
+        hours=hours,
+    )
+
+
+@rooms_bp.route("/kiosk/<building>")
+def kiosk(building):
+    """Full-screen hallway display; the page only bootstraps, data comes from /api/v1/kiosk."""
+    return render_template(
+        "kiosk.html", building=building, poll_seconds=current_app.config["KIOSK_POLL_SECONDS"]
+    )
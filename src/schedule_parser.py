@@ -0,0 +1,223 @@
+"""
+Parsing of uploaded schedule files into plain row tuples.
+
+Everything here is free of Flask and database state so that workbook
+parsing (CPU-bound in openpyxl) can run in a process pool.
+"""
+import multiprocessing
+import os
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+
+import pandas as pd
+from openpyxl import load_workbook
+
+REQUIRED_COLUMNS = ("Room", "Date", "OpenTime", "CloseTime")
+
+
+@dataclass
+class ParsedSheet:
+    """Rows parsed from one CSV file or one workbook sheet."""
+
+    filename: str
+    sheet: str | None
+    rows: list[tuple] = field(default_factory=list)  # (building, number, date, open, close)
+    rejected: list[tuple[int, str]] = field(default_factory=list)  # (spreadsheet row, reason)
+    error: str | None = None
+
+    @property
+    def skipped(self) -> int:
+        return len(self.rejected)
+
+    @property
+    def label(self) -> str:
+        return f"{self.filename} [{self.sheet}]" if self.sheet else self.filename
+
+
+def _split_room_label(label: str | None) -> tuple[str | None, str | None]:
+    label = "" if label is None else str(label).strip()
+    if not label:
+        return None, None
+    parts = label.split(None, 1)
+    building = parts[0]
+    number = parts[1] if len(parts) > 1 else "000"
+    return building, number
+
+
+def _parse_date(value):
+    # NaT (a blank cell in a datetime column) is itself a datetime, so check it first.
+    if pd.isna(value):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return pd.to_datetime(value).date()
+    except Exception:
+        return None
+
+
+def _parse_time(value):
+    if pd.isna(value):
+        return None
+    if isinstance(value, time):
+        return value
+    if isinstance(value, datetime):
+        return value.time()
+    try:
+        return pd.to_datetime(value).time()
+    except Exception:
+        return None
+
+
+def _parse_column(values: pd.Series, parse_one, kind: str) -> list:
+    """Parse a whole Date or time column at once, falling back to ``parse_one`` per cell.
+
+    pandas converts a uniformly formatted column in C; only the cells it
+    rejects (mixed formats, native ``time`` objects from a workbook) go
+    through the slower scalar parser, so the results match it exactly.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            stamps = pd.to_datetime(values, errors="coerce")
+    except (TypeError, ValueError, OverflowError):
+        return [parse_one(value) for value in values]
+
+    converted = stamps.dt.date if kind == "date" else stamps.dt.time
+    missing = stamps.isna()
+    return [
+        parse_one(value) if is_missing else parsed
+        for value, parsed, is_missing in zip(values, converted, missing)
+    ]
+
+
+def _is_csv(path: str) -> bool:
+    return path.lower().endswith((".csv", ".csv.gz"))
+
+
+def list_sheets(path: str) -> list[str | None]:
+    """Sheet names of a workbook, or ``[None]`` for a (possibly gzipped) CSV file."""
+    if _is_csv(path):
+        return [None]
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def read_sheet(path: str, sheet: str | None) -> pd.DataFrame:
+    if sheet is None:
+        return pd.read_csv(path)  # infers gzip from a .csv.gz name
+    # Stream the sheet with openpyxl's read-only reader rather than
+    # pd.read_excel, which loads the whole workbook for every sheet.
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = [str(c).strip() if c is not None else "" for c in header]
+        return pd.DataFrame([row for row in rows if any(v is not None for v in row)], columns=columns)
+    finally:
+        workbook.close()
+
+
+def parse_rows(df: pd.DataFrame, filename: str, sheet: str | None = None) -> ParsedSheet:
+    result = ParsedSheet(filename=filename, sheet=sheet)
+    if not set(REQUIRED_COLUMNS).issubset(df.columns):
+        result.error = "missing columns: " + ", ".join(c for c in REQUIRED_COLUMNS if c not in df.columns)
+        return result
+
+    # Column-wise zip instead of DataFrame.iterrows(), which builds a Series per row.
+    # Spreadsheet row numbers start at 2 because row 1 holds the header.
+    columns = zip(
+        df["Room"],
+        _parse_column(df["Date"], _parse_date, "date"),
+        _parse_column(df["OpenTime"], _parse_time, "time"),
+        _parse_column(df["CloseTime"], _parse_time, "time"),
+    )
+    for line, (room, date_value, open_time, close_time) in enumerate(columns, start=2):
+        building, number = _split_room_label(None if pd.isna(room) else room)
+
+        reason = None
+        if not (building and number):
+            reason = "missing room"
+        elif not date_value:
+            reason = "missing or invalid date"
+        elif not open_time:
+            reason = "missing or invalid open time"
+        elif not close_time:
+            reason = "missing or invalid close time"
+        if reason:
+            result.rejected.append((line, reason))
+            continue
+        result.rows.append((building, number, date_value, open_time, close_time))
+    return result
+
+
+def parse_sheet(path: str, filename: str, sheet: str | None) -> ParsedSheet:
+    """Read and parse one sheet; errors are reported on the result, never raised."""
+    try:
+        df = read_sheet(path, sheet)
+    except Exception as exc:
+        return ParsedSheet(filename=filename, sheet=sheet, error=f"could not read file ({exc})")
+    return parse_rows(df, filename, sheet)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """One persistent pool per process, created lazily (and again after a fork)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_pid = None
+
+
+def parse_files(files: list[tuple[str, str]], max_workers: int = 1) -> list[ParsedSheet]:
+    """Parse every sheet of every ``(path, display_name)`` file.
+
+    A single CSV/sheet is parsed inline; anything larger is fanned out one
+    task per sheet to the process pool. Results keep the input order, with
+    a file that cannot be read in its own place.
+    """
+    tasks = []
+    order = []  # an index into tasks, or the ParsedSheet of an unreadable file
+    for path, name in files:
+        try:
+            sheets = list_sheets(path)
+        except Exception as exc:
+            order.append(ParsedSheet(filename=name, sheet=None, error=f"could not read file ({exc})"))
+            continue
+        for sheet in sheets:
+            order.append(len(tasks))
+            tasks.append((path, name, sheet))
+
+    if len(tasks) <= 1 or max_workers <= 1:
+        parsed = [parse_sheet(*task) for task in tasks]
+    else:
+        parsed = list(_get_pool(max_workers).map(parse_sheet, *zip(*tasks)))
+    return [parsed[item] if isinstance(item, int) else item for item in order]
@@ -0,0 +1,183 @@
+import re
+
+from sqlalchemy import DDL, and_, event, func, or_, select, text
+from sqlalchemy.orm import joinedload
+
+from . import db
+from .models import Issue, Room
+
+# SQLite: a standalone FTS5 table keyed by issue id, kept in sync by triggers.
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts
+    USING fts5(description, reporter, room_label, tokenize = 'unicode61 remove_diacritics 2')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS issues_fts_ai AFTER INSERT ON issues BEGIN
+        INSERT INTO issues_fts (rowid, description, reporter, room_label)
+        SELECT new.id, new.description, coalesce(new.reporter_id, ''), r.building || ' ' || r.number
+        FROM rooms r WHERE r.id = new.room_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS issues_fts_au AFTER UPDATE OF description, reporter_id, room_id ON issues BEGIN
+        DELETE FROM issues_fts WHERE rowid = old.id;
+        INSERT INTO issues_fts (rowid, description, reporter, room_label)
+        SELECT new.id, new.description, coalesce(new.reporter_id, ''), r.building || ' ' || r.number
+        FROM rooms r WHERE r.id = new.room_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS issues_fts_ad AFTER DELETE ON issues BEGIN
+        DELETE FROM issues_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS rooms_fts_au AFTER UPDATE OF building, number ON rooms BEGIN
+        UPDATE issues_fts SET room_label = new.building || ' ' || new.number
+        WHERE rowid IN (SELECT id FROM issues WHERE room_id = new.id);
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS rooms_fts_au",
+    "DROP TABLE IF EXISTS issues_fts",
+]
+
+# PostgreSQL: a tsvector column on issues maintained by triggers, with a GIN index.
+POSTGRES_CREATE = [
+    "ALTER TABLE issues ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_issues_search_vector ON issues USING gin (search_vector)",
+    """
+    CREATE OR REPLACE FUNCTION issues_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(
+                (SELECT building || ' ' || number FROM rooms WHERE id = NEW.room_id), '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.reporter_id, '')), 'B') ||
+            setweight(to_tsvector('simple', NEW.description), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS issues_search_vector_trg ON issues",
+    """
+    CREATE TRIGGER issues_search_vector_trg BEFORE INSERT OR UPDATE OF description, reporter_id, room_id
+    ON issues FOR EACH ROW EXECUTE FUNCTION issues_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION rooms_search_vector_refresh() RETURNS trigger AS $$
+    BEGIN
+        UPDATE issues SET room_id = room_id WHERE room_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS rooms_search_vector_trg ON rooms",
+    """
+    CREATE TRIGGER rooms_search_vector_trg AFTER UPDATE OF building, number
+    ON rooms FOR EACH ROW EXECUTE FUNCTION rooms_search_vector_refresh()
+    """,
+]
+
+POSTGRES_DROP = [
+    "DROP TRIGGER IF EXISTS rooms_search_vector_trg ON rooms",
+    "DROP FUNCTION IF EXISTS rooms_search_vector_refresh()",
+]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _register_ddl():
+    table = Issue.__table__
+    for statement in SQLITE_CREATE:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in SQLITE_DROP:
+        event.listen(table, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_CREATE:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    for statement in POSTGRES_DROP:
+        event.listen(table, "before_drop", DDL(statement).execute_if(dialect="postgresql"))
+
+
+_register_ddl()
+
+
+def _fts_query(terms: list[str]) -> str:
+    # Quote every token so user input can never be parsed as FTS syntax;
+    # the trailing * gives prefix matching ("proj" finds "projector").
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _like_search(terms: list[str], limit: int, offset: int) -> tuple[list[int], int]:
+    """Unranked fallback for databases without a full-text index.
+
+    Every term must appear, ignoring case, in the description, reporter or
+    room label (ILIKE where the database has it, LOWER(...) LIKE elsewhere).
+    """
+    label = Room.building + " " + Room.number
+    matches = and_(*(
+        or_(
+            Issue.description.icontains(term, autoescape=True),
+            func.coalesce(Issue.reporter_id, "").icontains(term, autoescape=True),
+            label.icontains(term, autoescape=True),
+        )
+        for term in terms
+    ))
+    stmt = select(Issue.id).join(Room, Room.id == Issue.room_id).where(matches)
+    total = db.session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+    ids = db.session.execute(stmt.order_by(Issue.id.desc()).limit(limit).offset(offset)).scalars().all()
+    return ids, total
+
+
+def search_issues(query: str, page: int = 1, per_page: int = 20) -> tuple[list[Issue], int]:
+    """Ranked full-text search over issue text, reporter and room label.
+
+    Returns one page of issues (best match first) and the total hit count.
+    Databases without a full-text index get a substring match, newest first.
+    """
+    terms = _TOKEN_RE.findall(query or "")
+    if not terms:
+        return [], 0
+
+    page = max(page, 1)
+    offset = (page - 1) * per_page
+    dialect = db.engine.dialect.name
+
+    if dialect == "sqlite":
+        match = _fts_query(terms)
+        total = db.session.execute(
+            text("SELECT count(*) FROM issues_fts WHERE issues_fts MATCH :q"), {"q": match}
+        ).scalar()
+        ids = db.session.execute(
+            text(
+                "SELECT rowid FROM issues_fts WHERE issues_fts MATCH :q "
+                "ORDER BY bm25(issues_fts, 1.0, 2.0, 4.0) LIMIT :limit OFFSET :offset"
+            ),
+            {"q": match, "limit": per_page, "offset": offset},
+        ).scalars().all()
+    elif dialect == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        total = db.session.execute(
+            text("SELECT count(*) FROM issues WHERE search_vector @@ to_tsquery('simple', :q)"),
+            {"q": tsquery},
+        ).scalar()
+        ids = db.session.execute(
+            text(
+                "SELECT id FROM issues WHERE search_vector @@ to_tsquery('simple', :q) "
+                "ORDER BY ts_rank(search_vector, to_tsquery('simple', :q)) DESC, id DESC "
+                "LIMIT :limit OFFSET :offset"
+            ),
+            {"q": tsquery, "limit": per_page, "offset": offset},
+        ).scalars().all()
+    else:
+        ids, total = _like_search(terms, per_page, offset)
+
+    if not ids:
+        return [], total
+    issues = {
+        issue.id: issue
+        for issue in Issue.query.options(joinedload(Issue.room)).filter(Issue.id.in_(ids))
+    }
+    return [issues[i] for i in ids if i in issues], total
@@ -0,0 +1,184 @@
+import sys
+import threading
+import time as _time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, time
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from . import db
+from .changelog import latest_cursor
+from .models import Room
+from .recurrence import occurrences
+
+
+class RoomRow(NamedTuple):
+    id: int
+    building: str
+    number: str
+    status: str
+    version: int
+
+
+def _seconds(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _from_seconds(seconds: int) -> time:
+    return time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class RoomSnapshot:
+    """Immutable columnar copy of every room and today's schedule intervals.
+
+    Rooms are stored sorted by id in parallel arrays (buildings and numbers
+    as interned strings, statuses as codes into ``statuses``); today's
+    intervals, recurrences included, are stored sorted by room id as seconds
+    after midnight. A snapshot is never modified, so readers need no locking.
+    """
+
+    def __init__(self, cursor: int, day: date, rooms, intervals):
+        self.cursor = cursor
+        self.day = day
+        self.built_at = _time.monotonic()
+
+        self.statuses: list[str] = []
+        codes: dict[str, int] = {}
+        self.ids = array("q")
+        self.buildings: list[str] = []
+        self.numbers: list[str] = []
+        self.status_codes = array("B")
+        self.versions = array("q")
+        for room_id, building, number, status, version in rooms:
+            status = status or "Available"
+            if status not in codes:
+                codes[status] = len(self.statuses)
+                self.statuses.append(sys.intern(status))
+            self.ids.append(room_id)
+            self.buildings.append(sys.intern(building))
+            self.numbers.append(sys.intern(number))
+            self.status_codes.append(codes[status])
+            self.versions.append(version)
+
+        # Positions in display order: building, then room number.
+        self.display_order = array(
+            "l", sorted(range(len(self.ids)), key=lambda i: (self.buildings[i], self.numbers[i]))
+        )
+
+        self.interval_rooms = array("q")
+        self.interval_opens = array("l")
+        self.interval_closes = array("l")
+        for room_id, open_time, close_time in intervals:
+            self.interval_rooms.append(room_id)
+            self.interval_opens.append(_seconds(open_time))
+            self.interval_closes.append(_seconds(close_time))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _row(self, i: int) -> RoomRow:
+        return RoomRow(
+            self.ids[i], self.buildings[i], self.numbers[i], self.statuses[self.status_codes[i]], self.versions[i]
+        )
+
+    def rooms(self) -> list[RoomRow]:
+        """Every room, ordered by building and number."""
+        return [self._row(i) for i in self.display_order]
+
+    def room(self, room_id: int) -> RoomRow | None:
+        i = bisect_left(self.ids, room_id)
+        if i < len(self.ids) and self.ids[i] == room_id:
+            return self._row(i)
+        return None
+
+    def select(self, fields, ids=None, after: int | None = None, limit: int | None = None) -> list[tuple]:
+        """Room columns as tuples in id order, mirroring a column-only SQL select."""
+        if ids is not None:
+            wanted = set(ids)
+            positions = sorted(
+                i for i in (bisect_left(self.ids, room_id) for room_id in wanted)
+                if i < len(self.ids) and self.ids[i] in wanted
+            )
+        else:
+            start = bisect_right(self.ids, after) if after is not None else 0
+            stop = len(self.ids) if limit is None else min(start + limit, len(self.ids))
+            positions = range(start, stop)
+        return [tuple(getattr(self._row(i), f) for f in fields) for i in positions]
+
+    def intervals(self, room_id: int) -> list[tuple[time, time]]:
+        """Today's (open, close) intervals of one room, earliest first."""
+        return [(_from_seconds(open_s), _from_seconds(close_s)) for open_s, close_s in self.interval_seconds(room_id)]
+
+    def interval_seconds(self, room_id: int) -> list[tuple[int, int]]:
+        """Today's intervals of one room as seconds after midnight."""
+        lo = bisect_left(self.interval_rooms, room_id)
+        hi = bisect_right(self.interval_rooms, room_id)
+        return [(self.interval_opens[i], self.interval_closes[i]) for i in range(lo, hi)]
+
+    def scheduled_now(self, room_id: int, at: time) -> bool:
+        seconds = _seconds(at)
+        lo = bisect_left(self.interval_rooms, room_id)
+        hi = bisect_right(self.interval_rooms, room_id)
+        return any(self.interval_opens[i] <= seconds < self.interval_closes[i] for i in range(lo, hi))
+
+
+class SnapshotStore:
+    """Holds the current RoomSnapshot and swaps in a new one when the data changes.
+
+    Staleness is detected with the change-log cursor, which every worker can
+    read, so a toggle in one process is visible to the others on their next
+    request. ``SNAPSHOT_MAX_AGE`` bounds how long a snapshot can miss a change
+    whose log row committed out of id order.
+    """
+
+    def __init__(self):
+        self._snapshot: RoomSnapshot | None = None
+        self._lock = threading.Lock()
+        self.max_age = 60
+
+    def init_app(self, app):
+        app.config.setdefault("SNAPSHOT_MAX_AGE", 60)
+        self.max_age = app.config["SNAPSHOT_MAX_AGE"]
+        self.invalidate()
+        app.extensions["room_snapshot"] = self
+
+    def invalidate(self):
+        """Force a rebuild on the next read."""
+        self._snapshot = None
+
+    def _fresh(self, snapshot: RoomSnapshot | None, cursor: int, today: date) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.cursor == cursor
+            and snapshot.day == today
+            and _time.monotonic() - snapshot.built_at < self.max_age
+        )
+
+    def current(self) -> RoomSnapshot:
+        cursor = latest_cursor()
+        today = date.today()
+        snapshot = self._snapshot
+        if self._fresh(snapshot, cursor, today):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if not self._fresh(snapshot, cursor, today):
+                snapshot = self._build(cursor, today)
+                self._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def _build(cursor: int, today: date) -> RoomSnapshot:
+        rooms = db.session.execute(
+            select(Room.id, Room.building, Room.number, Room.status, Room.version).order_by(Room.id)
+        ).all()
+        intervals = sorted(
+            (room_id, open_time, close_time)
+            for room_id, _, open_time, close_time in occurrences(today, today)
+        )
+        return RoomSnapshot(cursor, today, rooms, intervals)
+
+
+room_snapshot = SnapshotStore()
@@ -0,0 +1,268 @@
+"""
+Schedule-driven room status: rooms turn Occupied when a scheduled session
+starts and Available when it ends, without anyone pressing Toggle.
+"""
+import heapq
+import os
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import exists, func, select, update
+
+from . import db
+from .audit import audit
+from .changelog import latest_cursor, record_changes
+from .lifecycle import lifecycle
+from .models import ChangeLog, Room
+from .recurrence import occurrences
+
+try:  # POSIX only; without it every process runs its own scheduler
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# Rooms per UPDATE ... WHERE id IN (...) statement.
+UPDATE_BATCH_SIZE = 500
+
+
+class StatusScheduler:
+    """Flips room statuses at the open and close times of today's schedules.
+
+    Today's intervals (one-off rows and recurrences) are loaded once per day,
+    and every open and close time goes on a heap. The scheduler thread sleeps
+    until the earliest entry is due, then sets each room it names to what the
+    schedule says at that moment: Occupied inside any interval, Available
+    otherwise. Rooms with nothing due are never touched, so manual toggles
+    stand until the room's next boundary.
+
+    When a day is loaded, rooms that already passed a boundary today and
+    have not been changed since are brought up to date (the catch-up pass).
+    After that, the scheduler only
+    re-reads today's intervals when the change log shows schedules or
+    recurrences were written. Imports in this process wake it at once, and
+    the change log tells it about writes in other processes. Only one
+    process runs the scheduler; it is chosen with a lock file.
+    """
+
+    def __init__(self, app=None):
+        self._app = None
+        self._day: date | None = None
+        self._cursor = 0
+        self._intervals: dict[int, list[tuple[datetime, datetime]]] = {}
+        self._heap: list[tuple[datetime, int]] = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._lock_file = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("AUTO_STATUS_ENABLED", True)
+        app.config.setdefault("AUTO_STATUS_SYNC_INTERVAL", 30)
+        app.config.setdefault("AUTO_STATUS_LOCK_FILE", os.path.join(app.instance_path, "status-scheduler.lock"))
+        if self._app is None:
+            lifecycle.on_shutdown(self.stop)
+        self._app = app
+        app.extensions["status_scheduler"] = self
+
+    @property
+    def next_due(self) -> datetime | None:
+        return self._heap[0][0] if self._heap else None
+
+    # --- thread management -------------------------------------------------
+
+    def start(self) -> bool:
+        """Start the scheduler thread in this process (once); False when disabled."""
+        if not self._app.config["AUTO_STATUS_ENABLED"]:
+            return False
+        if self._thread_pid == os.getpid() and self._thread.is_alive():
+            return True
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="status-scheduler", daemon=True)
+        self._thread_pid = os.getpid()
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread_pid == os.getpid() and self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def wake(self):
+        """Ask the scheduler to check for schedule changes now rather than at its next sync."""
+        self._wake.set()
+
+    def _acquire_lock(self) -> bool:
+        if fcntl is None or self._lock_file is not None:
+            return True
+        path = self._app.config["AUTO_STATUS_LOCK_FILE"]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_file = open(path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run(self):
+        interval = self._app.config["AUTO_STATUS_SYNC_INTERVAL"]
+        while not self._stopping.is_set():
+            timeout = interval
+            if self._acquire_lock():
+                try:
+                    with self._app.app_context():
+                        now = datetime.now()
+                        self.refresh(now)
+                        self.run_due(now)
+                        timeout = self._seconds_until_next(datetime.now(), interval)
+                except Exception:
+                    self._app.logger.exception("Room status scheduler pass failed")
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _seconds_until_next(self, now: datetime, interval: float) -> float:
+        midnight = datetime.combine(now.date() + timedelta(days=1), time())
+        due = min(self.next_due or midnight, midnight)
+        return max(min((due - now).total_seconds(), interval), 0)
+
+    # --- scheduling --------------------------------------------------------
+
+    def refresh(self, now: datetime) -> int:
+        """Load a new day, or re-read today's intervals if schedules changed; returns rooms updated."""
+        if self._day != now.date():
+            return self._load_day(now)
+        if not db.session.execute(
+            select(exists().where(
+                ChangeLog.id > self._cursor, ChangeLog.table_name.in_(("schedules", "recurrences"))
+            ))
+        ).scalar():
+            return 0
+        return self._reload(now)
+
+    def run_due(self, now: datetime) -> int:
+        """Apply every heap entry due at ``now``; returns the number of rooms whose status changed."""
+        due = set()
+        while self._heap and self._heap[0][0] <= now:
+            when, room_id = heapq.heappop(self._heap)
+            # Entries of intervals that a reload removed are skipped here rather
+            # than searched for in the heap.
+            if any(when in interval for interval in self._intervals.get(room_id, ())):
+                due.add(room_id)
+        return self._apply(due, now)
+
+    def _read_intervals(self, day: date) -> dict[int, list[tuple[datetime, datetime]]]:
+        intervals: dict[int, list[tuple[datetime, datetime]]] = {}
+        for room_id, _, open_time, close_time in occurrences(day, day):
+            intervals.setdefault(room_id, []).append(
+                (datetime.combine(day, open_time), datetime.combine(day, close_time))
+            )
+        return intervals
+
+    def _push(self, room_id: int, now: datetime):
+        for open_at, close_at in self._intervals.get(room_id, ()):
+            for when in (open_at, close_at):
+                if when > now:
+                    heapq.heappush(self._heap, (when, room_id))
+
+    def _load_day(self, now: datetime) -> int:
+        self._cursor = latest_cursor()
+        self._day = now.date()
+        self._intervals = self._read_intervals(self._day)
+        self._heap = []
+        for room_id in self._intervals:
+            self._push(room_id, now)
+        # Catch-up: rooms that have already passed an open or close time today.
+        # A room changed after its last boundary (a manual toggle, or this pass
+        # in an earlier process) is left alone, as a running scheduler would.
+        boundaries = {}
+        for room_id, intervals in self._intervals.items():
+            passed = [when for interval in intervals for when in interval if when <= now]
+            if passed:
+                boundaries[room_id] = max(passed)
+        changed = self._last_changed(boundaries)
+        due = {
+            room_id for room_id, boundary in boundaries.items()
+            if room_id not in changed or changed[room_id] < _as_utc(boundary)
+        }
+        return self._apply(due, now)
+
+    @staticmethod
+    def _last_changed(room_ids) -> dict[int, datetime]:
+        """When each room was last written, from the change log (UTC, like ``changed_at``)."""
+        room_ids = sorted(room_ids)
+        changed = {}
+        for start in range(0, len(room_ids), UPDATE_BATCH_SIZE):
+            batch = room_ids[start:start + UPDATE_BATCH_SIZE]
+            changed.update(tuple(row) for row in db.session.execute(
+                select(ChangeLog.row_id, func.max(ChangeLog.changed_at))
+                .where(ChangeLog.table_name == "rooms", ChangeLog.row_id.in_(batch))
+                .group_by(ChangeLog.row_id)
+            ))
+        return changed
+
+    def _reload(self, now: datetime) -> int:
+        self._cursor = latest_cursor()
+        old = self._intervals
+        self._intervals = self._read_intervals(self._day)
+        changed = {
+            room_id for room_id in old.keys() | self._intervals.keys()
+            if old.get(room_id) != self._intervals.get(room_id)
+        }
+        for room_id in changed:
+            self._push(room_id, now)
+        # Only rooms whose schedule now says something different for this moment
+        # are updated; a manual toggle of an unaffected room stands.
+        flipped = {
+            room_id for room_id in changed
+            if self._occupied(old.get(room_id, ()), now) != self._occupied(self._intervals.get(room_id, ()), now)
+        }
+        return self._apply(flipped, now)
+
+    @staticmethod
+    def _occupied(intervals, now: datetime) -> bool:
+        return any(open_at <= now < close_at for open_at, close_at in intervals)
+
+    def _apply(self, room_ids, now: datetime) -> int:
+        """Set each room to its scheduled status at ``now`` with batched, versioned UPDATEs."""
+        by_status: dict[str, list[int]] = {"Occupied": [], "Available": []}
+        for room_id in sorted(room_ids):
+            occupied = self._occupied(self._intervals.get(room_id, ()), now)
+            by_status["Occupied" if occupied else "Available"].append(room_id)
+
+        changed: dict[str, list[int]] = {}
+        for status, ids in by_status.items():
+            for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+                changed.setdefault(status, []).extend(db.session.execute(
+                    update(Room)
+                    .where(Room.id.in_(ids[start:start + UPDATE_BATCH_SIZE]), Room.status != status)
+                    .values(status=status, version=Room.version + 1)
+                    .returning(Room.id)
+                    .execution_options(synchronize_session=False)
+                ).scalars())
+
+        updated = [room_id for ids in changed.values() for room_id in ids]
+        if not updated:
+            db.session.rollback()
+            return 0
+        record_changes(db.session, "rooms", updated)
+        db.session.commit()
+        for status, ids in changed.items():
+            if ids:
+                audit.record(
+                    "room.auto_status", "room", actor="scheduler",
+                    details=f"{len(ids)} room(s) -> {status} at {now:%H:%M}",
+                )
+        return len(updated)
+
+
+def _as_utc(local: datetime) -> datetime:
+    """A naive local time as naive UTC, for comparing with change-log timestamps."""
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+status_scheduler = StatusScheduler()
@@ -0,0 +1,138 @@
+import contextlib
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time as _time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import delete, select
+
+from . import db
+from .models import ImportFile, ScheduleImport
+
+# Text formats compress well; xlsx is already a zip archive and is stored as-is.
+COMPRESSED_EXTENSIONS = {"csv"}
+_LEGACY_UPLOAD_RE = re.compile(r"^\d{14}_.+")
+_BLOB_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+(\.gz)?$")
+
+
+def _blob_root() -> str:
+    path = os.path.join(current_app.config["UPLOAD_FOLDER"], "blobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def blob_path(blob_name: str) -> str:
+    if not _BLOB_RE.fullmatch(blob_name):
+        raise ValueError(f"Invalid blob name: {blob_name!r}")
+    return os.path.join(_blob_root(), blob_name[:2], blob_name)
+
+
+def store_upload(file, filename: str) -> str:
+    """Store an uploaded file by content hash and return its blob name.
+
+    Identical uploads share one blob. CSV blobs are gzip-compressed; the
+    parser reads ``.csv.gz`` directly, so callers never decompress by hand.
+    """
+    ext = filename.rsplit(".", 1)[-1].lower()
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=_blob_root(), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
+                digest.update(chunk)
+                out.write(chunk)
+
+        blob_name = f"{digest.hexdigest()}.{ext}"
+        if ext in COMPRESSED_EXTENSIONS:
+            blob_name += ".gz"
+        target = blob_path(blob_name)
+        if os.path.exists(target):
+            os.utime(target)
+            return blob_name
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if blob_name.endswith(".gz"):
+            packed = f"{tmp_path}.gz"
+            with open(tmp_path, "rb") as src, gzip.open(packed, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(packed, target)
+        else:
+            os.replace(tmp_path, target)
+        return blob_name
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _timestamp(moment: datetime) -> float:
+    """A naive UTC datetime as a file-mtime timestamp."""
+    return _time.time() - (datetime.utcnow() - moment).total_seconds()
+
+
+def sweep(retention_days: int, now: datetime | None = None) -> dict:
+    """Forget stored files of imports older than ``retention_days`` and delete unreferenced blobs.
+
+    The ScheduleImport rows and their schedules are kept; only the ability to
+    re-run those imports goes away. A blob no ImportFile row refers to (its
+    imports were forgotten, its preview was discarded or expired, or it never
+    parsed) is deleted once it is older than twice IMPORT_PREVIEW_TTL, so a
+    preview committed just before it expired has long since written its rows.
+    Old pre-blob ``<timestamp>_<name>`` uploads are removed by age as well.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=retention_days)
+
+    expired_imports = select(ScheduleImport.id).where(ScheduleImport.upload_time < cutoff)
+    forgotten = db.session.execute(
+        delete(ImportFile).where(ImportFile.import_id.in_(expired_imports))
+    ).rowcount
+    db.session.commit()
+    referenced = set(db.session.execute(select(ImportFile.blob_name).distinct()).scalars())
+
+    # A blob uploaded again since has a fresh mtime (store_upload touches it)
+    # and is kept even if its new import row is not committed yet.
+    orphan_ts = _timestamp(now - timedelta(seconds=2 * current_app.config["IMPORT_PREVIEW_TTL"]))
+    removed_blobs = 0
+    for bucket in os.scandir(_blob_root()):
+        entries = os.scandir(bucket.path) if bucket.is_dir() else [bucket]
+        for entry in entries:
+            # Leftover .part files of interrupted uploads go the same way.
+            if _BLOB_RE.fullmatch(entry.name) and entry.name in referenced:
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                if entry.is_file() and entry.stat().st_mtime < orphan_ts:
+                    os.remove(entry.path)
+                    removed_blobs += 1
+
+    cutoff_ts = _timestamp(cutoff)
+
+    removed_legacy = 0
+    upload_root = current_app.config["UPLOAD_FOLDER"]
+    for entry in os.scandir(upload_root):
+        if entry.is_file() and _LEGACY_UPLOAD_RE.match(entry.name) and entry.stat().st_mtime < cutoff_ts:
+            os.remove(entry.path)
+            removed_legacy += 1
+
+    return {"forgotten": forgotten, "removed_blobs": removed_blobs, "removed_legacy": removed_legacy}
+
+
+@click.command("sweep-uploads")
+@click.option("--days", type=int, default=None, help="Retention in days (defaults to UPLOAD_RETENTION_DAYS).")
+def sweep_uploads_command(days):
+    """Delete stored upload files of old imports and files no import refers to."""
+    days = days if days is not None else current_app.config["UPLOAD_RETENTION_DAYS"]
+    result = sweep(days)
+    click.echo(
+        f"Forgot {result['forgotten']} stored file(s), removed {result['removed_blobs']} unreferenced blob(s) "
+        f"and {result['removed_legacy']} legacy upload(s) older than {days} days."
+    )
+
+
+def init_app(app):
+    app.cli.add_command(sweep_uploads_command)
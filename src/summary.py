@@ -0,0 +1,36 @@
+from sqlalchemy import case, func, select
+
+from . import db
+from .models import Issue, Room
+
+
+def building_summary() -> list[dict]:
+    """Available / occupied / open-issue counts per building from one grouped query.
+
+    Open issues are pre-aggregated per room so the join never multiplies
+    room rows; the result has one row per building however many rooms and
+    issues there are. It is not cached: the room cards next to it come from
+    the snapshot, which every worker keeps current, and the counts must agree.
+    """
+    open_issues = (
+        select(Issue.room_id, func.count().label("open_issues"))
+        .where(Issue.status != "Resolved")
+        .group_by(Issue.room_id)
+        .subquery()
+    )
+    stmt = (
+        select(
+            Room.building,
+            func.count(Room.id),
+            func.sum(case((Room.status == "Available", 1), else_=0)),
+            func.sum(case((Room.status == "Occupied", 1), else_=0)),
+            func.coalesce(func.sum(open_issues.c.open_issues), 0),
+        )
+        .outerjoin(open_issues, open_issues.c.room_id == Room.id)
+        .group_by(Room.building)
+        .order_by(Room.building)
+    )
+    return [
+        {"building": building, "rooms": rooms, "available": available, "occupied": occupied, "open_issues": issues}
+        for building, rooms, available, occupied, issues in db.session.execute(stmt)
+    ]
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from . import db
+from .cache import cache
+from .changelog import schedule_day_tag
+from .models import Room
+from .recurrence import occurrences
+
+# Grid bounds for the Gantt view, in minutes after midnight.
+DAY_START_MINUTES = 7 * 60
+DAY_END_MINUTES = 22 * 60
+
+
+def parse_timeline_args(args) -> tuple[str | None, date, str]:
+    """Read the building / date / span query args shared by the timeline page and the API."""
+    try:
+        start = date.fromisoformat(args.get("date", ""))
+    except ValueError:
+        start = date.today()
+    span = "week" if args.get("span") == "week" else "day"
+    return args.get("building"), start, span
+
+
+def _minutes(value) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _bar(open_time, close_time) -> dict:
+    span = DAY_END_MINUTES - DAY_START_MINUTES
+    start = min(max(_minutes(open_time), DAY_START_MINUTES), DAY_END_MINUTES)
+    end = min(max(_minutes(close_time), DAY_START_MINUTES), DAY_END_MINUTES)
+    return {
+        "open": open_time.strftime("%H:%M"),
+        "close": close_time.strftime("%H:%M"),
+        "left": round((start - DAY_START_MINUTES) * 100 / span, 2),
+        "width": round(max(end - start, 0) * 100 / span, 2),
+    }
+
+
+def _load_days(building: str, days: list[date]) -> dict[date, dict]:
+    """Fetch every room of a building and its occurrences (one-off and recurring) for ``days``."""
+    rooms: OrderedDict[int, dict] = OrderedDict(
+        (room_id, {"id": room_id, "number": number, "status": status})
+        for room_id, number, status in db.session.execute(
+            select(Room.id, Room.number, Room.status).where(Room.building == building).order_by(Room.number)
+        )
+    )
+    by_day: dict[date, dict[int, list]] = {day: {} for day in days}
+    for room_id, day, open_time, close_time in occurrences(min(days), max(days), buildings=[building]):
+        if day in by_day and room_id in rooms:
+            by_day[day].setdefault(room_id, []).append(_bar(open_time, close_time))
+
+    return {
+        day: {
+            "building": building,
+            "date": day.isoformat(),
+            "rooms": [dict(room, intervals=intervals.get(room_id, [])) for room_id, room in rooms.items()],
+        }
+        for day, intervals in by_day.items()
+    }
+
+
+def _cache_key(building: str, day: date) -> str:
+    return f"timeline:{building}:{day.isoformat()}"
+
+
+def room_timeline(building: str, start: date, days: int = 1) -> list[dict]:
+    """Per-day timelines for a building, served from the (building, day) cache when fresh.
+
+    Entries are tagged with ``rooms``, ``recurrences`` and the day's schedule
+    tag, so a commit touching a room, any recurrence or that date's schedules
+    drops them (see changelog.py).
+    """
+    wanted = [start + timedelta(days=offset) for offset in range(days)]
+    result: dict[date, dict] = {}
+    for day in wanted:
+        payload = cache.get(_cache_key(building, day))
+        if payload is not None:
+            result[day] = payload
+
+    missing = [day for day in wanted if day not in result]
+    if missing:
+        versions = {
+            day: cache.tag_versions(("rooms", "recurrences", schedule_day_tag(day))) for day in missing
+        }
+        loaded = _load_days(building, missing)
+        for day, payload in loaded.items():
+            cache.set(_cache_key(building, day), payload, ttl="timeline", versions=versions[day])
+        result.update(loaded)
+
+    return [result[day] for day in wanted]
@@ -0,0 +1,132 @@
+"""
+Shared test harness: one app and one in-memory database per process.
+
+The schema is created once per process (so once per pytest-xdist worker).
+Every test runs inside ``BEGIN ... ROLLBACK`` on the shared connection, and
+the transactions opened by the code under test become SAVEPOINTs within it,
+so commits behave normally during the test and nothing survives it.
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from sqlalchemy import insert
+from sqlalchemy.pool import StaticPool
+
+from src import create_app, db
+from src.audit import _AppAuditQueue, audit
+from src.cache import cache
+from src.changelog import TRACKED_TABLES, record_changes
+from src.config import Config
+from src.snapshot import room_snapshot
+
+
+class TestConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    # One in-memory database per process, shared by every connection (and
+    # thread) through StaticPool. Autocommit mode lets the test harness turn
+    # transactions into savepoints inside a per-test BEGIN ... ROLLBACK.
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "poolclass": StaticPool,
+        "connect_args": {"check_same_thread": False, "isolation_level": None},
+        "pool_reset_on_return": None,
+    }
+    UPLOAD_FOLDER = os.path.join(tempfile.gettempdir(), "campus-rooms-test-uploads")
+    AUTO_STATUS_ENABLED = False  # tests drive the status scheduler by hand
+
+
+class _ManualAuditQueue(_AppAuditQueue):
+    """Audit events wait in the queue until a test calls ``audit.flush()``.
+
+    A writer thread would open its own transactions on the shared connection
+    and interleave its savepoints with the test's.
+    """
+
+    def _ensure_writer(self):
+        pass
+
+_app = None
+_raw_connection = None
+_savepoints: list[str] = []
+_savepoint_lock = threading.Lock()
+
+
+def _do_begin(dbapi_connection):
+    with _savepoint_lock:
+        name = f"test_sp_{len(_savepoints)}"
+        _savepoints.append(name)
+    dbapi_connection.execute(f"SAVEPOINT {name}")
+
+
+def _do_commit(dbapi_connection):
+    with _savepoint_lock:
+        name = _savepoints.pop() if _savepoints else None
+    if name:
+        dbapi_connection.execute(f"RELEASE {name}")
+
+
+def _do_rollback(dbapi_connection):
+    with _savepoint_lock:
+        name = _savepoints.pop() if _savepoints else None
+    if name:
+        dbapi_connection.execute(f"ROLLBACK TO {name}")
+        dbapi_connection.execute(f"RELEASE {name}")
+
+
+def get_app():
+    """The process-wide test app, with its schema created on first use."""
+    global _app, _raw_connection
+    if _app is None:
+        _app = create_app(TestConfig)
+        with _app.app_context():
+            # Every connection shares one sqlite3 connection (StaticPool), so
+            # transactions nest; map them onto savepoints, innermost first.
+            dialect = db.engine.dialect
+            dialect.do_begin = _do_begin
+            dialect.do_commit = _do_commit
+            dialect.do_rollback = _do_rollback
+            db.create_all()
+            _raw_connection = db.engine.raw_connection().driver_connection
+        _app.extensions["audit"] = _ManualAuditQueue(_app)
+    return _app
+
+
+def load_rows(model, rows: list[dict], log_changes: bool = True) -> list[int]:
+    """Bulk-insert fixture rows with one Core executemany; returns their ids.
+
+    Rows of tracked tables are written to the change log too unless
+    ``log_changes`` is False (for very large fixtures that no test syncs).
+    """
+    if not rows:
+        return []
+    ids = db.session.scalars(insert(model).returning(model.id), rows).all()
+    if log_changes and model.__tablename__ in TRACKED_TABLES:
+        record_changes(db.session, model.__tablename__, ids, "insert")
+    db.session.commit()
+    room_snapshot.invalidate()
+    return ids
+
+
+class AppTestCase(unittest.TestCase):
+    """Base class: a test client on the shared app and a rolled-back database."""
+
+    def setUp(self):
+        self.app = get_app()
+        self.client = self.app.test_client()
+        self._config = dict(self.app.config)
+
+        _savepoints.clear()
+        _raw_connection.execute("BEGIN")
+        cache.clear()
+        room_snapshot.invalidate()
+
+    def tearDown(self):
+        with self.app.app_context():
+            audit.flush()  # leave nothing queued for the next test
+            db.session.remove()
+        _raw_connection.execute("ROLLBACK")
+        self.app.config.clear()
+        self.app.config.update(self._config)
@@ -9,41 +9,23 @@ from io import BytesIO
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", category=Warning)
 
-from src import create_app, db
-from src.models import Issue, Room, Schedule, ScheduleImport
+from src import db
+from src.audit import audit
+from src.models import AuditLog, Issue, Room, Schedule, ScheduleImport
+from tests.harness import AppTestCase, load_rows
 
 
-class TestRoomScheduleApplication(unittest.TestCase):
+class TestRoomScheduleApplication(AppTestCase):
     """Comprehensive test suite for Room Schedule Management Application"""
 
     def setUp(self):
-        """Set up test client and in-memory database before each test"""
-        self.app = create_app()
-        self.app.config["TESTING"] = True
-        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
-        self.app.config["WTF_CSRF_ENABLED"] = False
-        
-        # Ensure instance directory exists (for CI/CD compatibility)
-        import os
-        instance_dir = os.path.join(os.path.dirname(self.app.instance_path), "instance")
-        os.makedirs(instance_dir, exist_ok=True)
-        
-        self.client = self.app.test_client()
-        
-        with self.app.app_context():
-            db.create_all()
-            
-            # Create sample rooms for testing
-            room1 = Room(building="TestBuilding", number="101", status="Available")
-            room2 = Room(building="TestBuilding", number="102", status="Occupied")
-            db.session.add_all([room1, room2])
-            db.session.commit()
-
-    def tearDown(self):
-        """Clean up after each test"""
+        """Seed two rooms in the per-test transaction of the shared in-memory database"""
+        super().setUp()
         with self.app.app_context():
-            db.session.remove()
-            db.drop_all()
+            load_rows(Room, [
+                {"building": "TestBuilding", "number": "101", "status": "Available"},
+                {"building": "TestBuilding", "number": "102", "status": "Occupied"},
+            ])
 
     # ==================== TEST 1: CSV Import Flow ====================
     def test_csv_import_flow(self):
@@ -321,6 +303,947 @@ Building2 203,2025-12-25,09:30:00,18:30:00"""
             room_issues = room.issues
             self.assertGreater(len(room_issues), 0)
 
+    # ==================== TEST 6: JSON API ====================
+    def test_json_api_fields_and_pagination(self):
+        """
+        Test 6: Read-only JSON API
+        - Request a sparse fieldset
+        - Walk the list with cursor pagination
+        - Batch fetch rooms by id
+        - Receive gzip when the client accepts it
+        """
+        with self.app.app_context():
+            response = self.client.get("/api/v1/rooms?fields=building&limit=1")
+            self.assertEqual(response.status_code, 200)
+            payload = response.get_json()
+            self.assertEqual(len(payload["data"]), 1)
+            self.assertEqual(set(payload["data"][0]), {"id", "building"})
+            self.assertIsNotNone(payload["next_cursor"])
+
+            response = self.client.get(f"/api/v1/rooms?limit=1&cursor={payload['next_cursor']}")
+            second_page = response.get_json()
+            self.assertEqual(second_page["data"][0]["number"], "102")
+            self.assertIsNone(second_page["next_cursor"])
+
+            ids = ",".join(str(r.id) for r in Room.query.all())
+            response = self.client.get(f"/api/v1/rooms?ids={ids}&shape=rows")
+            self.assertEqual(len(response.get_json()["rows"]), 2)
+
+            self.assertEqual(self.client.get("/api/v1/rooms?fields=nope").status_code, 400)
+            self.assertEqual(self.client.get("/api/v1/unknown").status_code, 404)
+
+            self.app.config["COMPRESS_MIN_SIZE"] = 0
+            response = self.client.get("/api/v1/rooms", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+
+    # ==================== TEST 7: Compression & Static Assets ====================
+    def test_compression_and_static_fingerprints(self):
+        """
+        Test 7: Response Compression and Static Fingerprinting
+        - Compress large HTML pages for gzip clients
+        - Leave responses alone for clients without gzip
+        - Version static URLs with a content hash
+        - Serve versioned assets with far-future caching
+        """
+        import gzip
+
+        with self.app.app_context():
+            self.app.config["COMPRESS_MIN_SIZE"] = 0
+            response = self.client.get("/dashboard", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+            html = gzip.decompress(response.data)
+            self.assertIn(b"Live Room Snapshot", html)
+
+            plain = self.client.get("/dashboard", headers={"Accept-Encoding": "gzip;q=0"})
+            self.assertNotIn("Content-Encoding", plain.headers)
+
+            self.assertIn(b"css/main.css?v=", plain.data)
+            start = plain.data.index(b"/static/css/main.css?v=")
+            css_url = plain.data[start:plain.data.index(b'"', start)].decode()
+            css = self.client.get(css_url, headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(css.status_code, 200)
+            self.assertIn("immutable", css.headers["Cache-Control"])
+            self.assertEqual(css.headers.get("Content-Encoding"), "gzip")
+            css.close()
+
+    # ==================== TEST 8: Health & Readiness ====================
+    def test_health_and_readiness(self):
+        """
+        Test 8: Health and Readiness Endpoints
+        - Liveness always answers ok
+        - Readiness checks the database
+        - Draining workers report not ready and refuse new imports
+        """
+        from src.lifecycle import lifecycle
+
+        self.assertEqual(self.client.get("/healthz").get_json()["status"], "ok")
+        self.assertEqual(self.client.get("/readyz").status_code, 200)
+
+        lifecycle.begin_drain()
+        try:
+            response = self.client.get("/readyz")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()["status"], "draining")
+
+            response = self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO(b"Room,Date,OpenTime,CloseTime\n"), "late.csv")},
+                content_type="multipart/form-data",
+                follow_redirects=True,
+            )
+            self.assertIn(b"restarting", response.data)
+            self.assertTrue(lifecycle.wait_idle(timeout=1))
+            self.assertGreater(lifecycle.drain_remaining(120), 119)
+            lifecycle._drain_started -= 200
+            self.assertEqual(lifecycle.drain_remaining(120), 0)
+        finally:
+            lifecycle._draining = False
+            lifecycle._drain_started = None
+
+    # ==================== TEST 9: Room Timeline ====================
+    def test_room_timeline(self):
+        """
+        Test 9: Per-day Room Timeline
+        - Render every room of a building with its intervals
+        - Serve the same data as JSON
+        - Refresh the cached day after an import touches it
+        """
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            db.session.add(Schedule(
+                room_id=room.id,
+                date=date(2025, 12, 22),
+                open_time=time(8, 0),
+                close_time=time(10, 30),
+            ))
+            db.session.commit()
+
+            response = self.client.get("/rooms/timeline?building=TestBuilding&date=2025-12-22")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b"08:00", response.data)
+            self.assertIn(b"TestBuilding 102", response.data)
+
+            payload = self.client.get(
+                "/api/v1/timeline?building=TestBuilding&date=2025-12-22"
+            ).get_json()
+            rooms = {r["number"]: r for r in payload["data"][0]["rooms"]}
+            self.assertEqual(len(rooms["101"]["intervals"]), 1)
+            self.assertEqual(rooms["102"]["intervals"], [])
+
+            csv_data = b"Room,Date,OpenTime,CloseTime\nTestBuilding 102,2025-12-22,13:00:00,15:00:00\n"
+            self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO(csv_data), "timeline.csv")},
+                content_type="multipart/form-data",
+            )
+            payload = self.client.get(
+                "/api/v1/timeline?building=TestBuilding&date=2025-12-22&span=week"
+            ).get_json()
+            self.assertEqual(len(payload["data"]), 7)
+            rooms = {r["number"]: r for r in payload["data"][0]["rooms"]}
+            self.assertEqual(rooms["102"]["intervals"][0]["open"], "13:00")
+
+    # ==================== TEST 10: Change Feed ====================
+    def test_changes_since_feed(self):
+        """
+        Test 10: Incremental Change Feed
+        - Record inserts, updates and deletes through session events
+        - Return only the rows changed after a cursor
+        - Collapse several changes to one row into its final state
+        """
+        with self.app.app_context():
+            start = self.client.get("/api/v1/changes").get_json()["next_cursor"]
+            self.assertGreater(start, 0, "Seed rooms should already be logged")
+
+            room = Room.query.filter_by(number="101").first()
+            room.toggle_status()
+            db.session.commit()
+            room.toggle_status()
+            db.session.commit()
+
+            issue = Issue(room_id=room.id, reporter_id="sync", description="Cable loose")
+            db.session.add(issue)
+            db.session.commit()
+            issue_id = issue.id
+            db.session.delete(issue)
+            db.session.commit()
+
+            payload = self.client.get(f"/api/v1/changes?since={start}").get_json()
+            changes = {(c["table"], c["id"]): c for c in payload["changes"]}
+            self.assertEqual(len(changes), 2)
+            self.assertEqual(changes[("rooms", room.id)]["op"], "update")
+            self.assertEqual(changes[("rooms", room.id)]["data"]["status"], "Available")
+            self.assertEqual(changes[("issues", issue_id)]["op"], "delete")
+            self.assertFalse(payload["has_more"])
+
+            cursor = payload["next_cursor"]
+            empty = self.client.get(f"/api/v1/changes?since={cursor}").get_json()
+            self.assertEqual(empty["changes"], [])
+            self.assertEqual(empty["next_cursor"], cursor)
+
+    # ==================== TEST 11: Audit Logging ====================
+    def test_audit_logging(self):
+        """
+        Test 11: Asynchronous Audit Logging
+        - Queue events for room and issue mutations
+        - Write them in a batch on flush
+        - Show them on the paginated audit page
+        - Keep a separate queue per app
+        """
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            self.client.post(f"/rooms/{room.id}/toggle")
+            self.client.post(
+                "/issues/report",
+                data={"room_id": room.id, "reporter_id": "auditor", "description": "Door jammed"},
+            )
+            issue = Issue.query.first()
+            self.client.post(f"/issues/{issue.id}/resolve")
+
+            self.assertEqual(AuditLog.query.count(), 0)  # still queued
+            audit.flush()
+            actions = [e.action for e in AuditLog.query.order_by(AuditLog.id).all()]
+            self.assertEqual(actions, ["room.toggle", "issue.report", "issue.resolve"])
+            reporter = AuditLog.query.filter_by(action="issue.report").first()
+            self.assertEqual(reporter.actor, "auditor")
+
+            response = self.client.get("/admin/audit?action=issue.resolve")
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b"issue #", response.data)
+            self.assertNotIn(b"room.toggle</td>", response.data)
+
+        # A second app gets its own queue; events keep going to the app they belong to.
+        from flask import Flask
+        other = Flask("other")
+        other.config["AUDIT_QUEUE_SIZE"] = 5
+        audit.init_app(other)
+        self.assertEqual(other.extensions["audit"].queue.maxsize, 5)
+        self.assertEqual(self.app.extensions["audit"].queue.maxsize, 10000)
+        with self.app.app_context():
+            audit.record("room.toggle", "room", 1, actor="tester")
+            audit.flush()
+            self.assertEqual(AuditLog.query.filter_by(actor="tester").count(), 1)
+        self.assertEqual(other.extensions["audit"].queue.qsize(), 0)
+
+    # ==================== TEST 12: Issue Search ====================
+    def test_issue_full_text_search(self):
+        """
+        Test 12: Full-text Issue Search
+        - Index issues through database triggers
+        - Match description, reporter and room label by prefix
+        - Follow room renames and issue deletes
+        - Fall back to a LIKE match on other databases
+        """
+        from unittest import mock
+        from src.search import search_issues
+
+        with self.app.app_context():
+            room1 = Room.query.filter_by(number="101").first()
+            room2 = Room.query.filter_by(number="102").first()
+            db.session.add_all([
+                Issue(room_id=room1.id, reporter_id="alice", description="Projector flickers"),
+                Issue(room_id=room2.id, reporter_id="bob", description="Broken chair near window"),
+                Issue(room_id=room2.id, reporter_id="carol", description="Projector remote missing"),
+            ])
+            db.session.commit()
+
+            results, total = search_issues("proj")
+            self.assertEqual(total, 2)
+            results, total = search_issues("projector 102")
+            self.assertEqual([i.reporter_id for i in results], ["carol"])
+            results, total = search_issues('bob"*(')
+            self.assertEqual(total, 1)
+
+            room2.building = "Annex"
+            db.session.commit()
+            self.assertEqual(search_issues("annex")[1], 2)
+
+            db.session.delete(Issue.query.filter_by(reporter_id="alice").first())
+            db.session.commit()
+            self.assertEqual(search_issues("flickers")[1], 0)
+
+            response = self.client.get("/issues?q=chair")
+            self.assertIn(b"1 result", response.data)
+            self.assertIn(b"Broken chair", response.data)
+
+            with mock.patch.object(db.engine.dialect, "name", "mysql"):
+                results, total = search_issues("PROJECTOR annex")
+                self.assertEqual(([i.reporter_id for i in results], total), (["carol"], 1))
+                self.assertEqual(search_issues("pro_ector")[1], 0)
+                response = self.client.get("/issues?q=chair")
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b"Broken chair", response.data)
+
+    # ==================== TEST 13: Multi-file / Multi-sheet Import ====================
+    def test_multi_file_multi_sheet_import(self):
+        """
+        Test 13: Parallel Multi-file and Multi-sheet Import
+        - Upload a two-sheet workbook and a CSV together
+        - Parse the sheets in the process pool
+        - Skip rows with a blank date or time cell
+        - Keep an unreadable file in its input position
+        - Store everything under one ScheduleImport
+        """
+        import tempfile
+        from src.schedule_parser import parse_files, shutdown_pool
+
+        from openpyxl import Workbook
+
+        book = Workbook()
+        north = book.active
+        north.title = "North"
+        north.append(["Room", "Date", "OpenTime", "CloseTime"])
+        north.append(["North 1", "2025-12-22", "08:00:00", "10:00:00"])
+        north.append(["North 2", "2025-12-22", "09:00:00", "11:00:00"])
+        south = book.create_sheet("South")
+        south.append(["Room", "Date", "OpenTime", "CloseTime"])
+        south.append(["South 1", date(2025, 12, 23), time(8, 0), time(10, 0)])
+        south.append([None, date(2025, 12, 23), time(9, 0), time(11, 0)])
+        # Blank cells in date and time columns come back from pandas as NaT.
+        south.append(["South 2", None, time(9, 0), time(11, 0)])
+        south.append(["South 3", date(2025, 12, 23), None, time(11, 0)])
+        workbook = BytesIO()
+        book.save(workbook)
+        workbook.seek(0)
+        csv_data = b"Room,Date,OpenTime,CloseTime\nTestBuilding 101,2025-12-24,08:00:00,09:00:00\n"
+
+        self.app.config["IMPORT_MAX_WORKERS"] = 2
+        try:
+            with self.app.app_context():
+                response = self.client.post(
+                    "/import",
+                    data={
+                        "schedule_file": [
+                            (workbook, "campus.xlsx"),
+                            (BytesIO(csv_data), "extra.csv"),
+                        ],
+                        "uploaded_by": "registrar",
+                    },
+                    content_type="multipart/form-data",
+                    follow_redirects=True,
+                )
+                self.assertIn(b"Imported 4 schedule rows from 3 sheets", response.data)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b"skipped 3", response.data)
+
+                self.assertEqual(ScheduleImport.query.count(), 1)
+                record = ScheduleImport.query.first()
+                self.assertEqual(record.filename, "campus.xlsx, extra.csv")
+                self.assertEqual(len(record.schedules), 4)
+                self.assertEqual(Room.query.filter_by(building="North").count(), 2)
+                self.assertEqual(Room.query.filter_by(building="TestBuilding").count(), 2)
+
+            # An unreadable file keeps its place among the parsed sheets.
+            with tempfile.TemporaryDirectory() as tmp:
+                paths = {name: os.path.join(tmp, name) for name in ("broken.xlsx", "extra.csv")}
+                with open(paths["broken.xlsx"], "wb") as fh:
+                    fh.write(b"not a workbook")
+                with open(paths["extra.csv"], "wb") as fh:
+                    fh.write(csv_data)
+                sheets = parse_files([(paths["broken.xlsx"], "broken.xlsx"), (paths["extra.csv"], "extra.csv")])
+                self.assertEqual([sheet.filename for sheet in sheets], ["broken.xlsx", "extra.csv"])
+                self.assertIsNotNone(sheets[0].error)
+                self.assertEqual(len(sheets[1].rows), 1)
+        finally:
+            shutdown_pool()
+
+    # ==================== TEST 14: Import Dry Run ====================
+    def test_import_dry_run_preview(self):
+        """
+        Test 14: Import Dry Run and Preview
+        - Upload with dry run and write nothing
+        - Report skipped rows, new rooms and conflicts
+        - Commit the cached parse result exactly once
+        """
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            db.session.add(Schedule(
+                room_id=room.id, date=date(2025, 12, 22), open_time=time(8, 0), close_time=time(10, 0)
+            ))
+            db.session.commit()
+
+            csv_data = (
+                b"Room,Date,OpenTime,CloseTime\n"
+                b"TestBuilding 101,2025-12-22,09:00:00,11:00:00\n"
+                b"Annex 7,2025-12-22,09:00:00,11:00:00\n"
+                b"Annex 7,not-a-date,09:00:00,11:00:00\n"
+            )
+            response = self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO(csv_data), "draft.csv"), "dry_run": "1"},
+                content_type="multipart/form-data",
+            )
+            self.assertEqual(response.status_code, 302)
+            preview_url = response.headers["Location"]
+            self.assertEqual(ScheduleImport.query.count(), 0)
+            self.assertEqual(Schedule.query.count(), 1)
+
+            page = self.client.get(preview_url)
+            self.assertIn(b"Import Preview", page.data)
+            self.assertIn(b"missing or invalid date", page.data)
+            self.assertIn(b"Annex 7", page.data)
+            self.assertIn(b"(existing)", page.data)
+
+            commit_url = preview_url.rstrip("/") + "/commit"
+            response = self.client.post(commit_url, follow_redirects=True)
+            self.assertIn(b"Imported 2 schedule rows", response.data)
+            self.assertEqual(Schedule.query.count(), 3)
+
+            response = self.client.post(commit_url, follow_redirects=True)
+            self.assertIn(b"already imported", response.data)
+            self.assertEqual(ScheduleImport.query.count(), 1)
+
+    # ==================== TEST 15: Upload Storage ====================
+    def test_content_addressed_upload_storage(self):
+        """
+        Test 15: Content-addressed Upload Storage
+        - Store identical uploads once, gzip-compressed
+        - Re-run an import from its stored blob, in place
+        - Sweep blobs of expired imports, discarded previews and failed uploads
+        """
+        import tempfile
+        from datetime import datetime, timedelta
+        from src.models import ImportFile
+        from src.storage import blob_path, sweep
+
+        csv_data = b"Room,Date,OpenTime,CloseTime\nTestBuilding 101,2025-12-22,08:00:00,09:00:00\n"
+        with tempfile.TemporaryDirectory() as upload_dir, self.app.app_context():
+            self.app.config["UPLOAD_FOLDER"] = upload_dir
+            for _ in range(2):
+                self.client.post(
+                    "/import",
+                    data={"schedule_file": (BytesIO(csv_data), "same.csv")},
+                    content_type="multipart/form-data",
+                )
+
+            files = ImportFile.query.all()
+            self.assertEqual(len(files), 2)
+            self.assertEqual(files[0].blob_name, files[1].blob_name)
+            self.assertTrue(files[0].blob_name.endswith(".csv.gz"))
+            stored_blob = blob_path(files[0].blob_name)
+            self.assertTrue(os.path.exists(stored_blob))
+            self.assertEqual(Schedule.query.count(), 2)
+
+            first = ScheduleImport.query.order_by(ScheduleImport.id).first()
+            response = self.client.post(f"/import/{first.id}/rerun", follow_redirects=True)
+            self.assertIn(b"Imported 1 schedule rows", response.data)
+            self.assertEqual(Schedule.query.count(), 2)
+            self.assertEqual(ScheduleImport.query.count(), 2)  # the rerun updates the original
+            self.assertEqual(Schedule.query.filter_by(import_id=first.id).count(), 1)
+            self.assertEqual(len(db.session.get(ScheduleImport, first.id).files), 1)
+
+            # A discarded preview and an unreadable upload leave blobs no import refers to.
+            draft = self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO(csv_data.replace(b"08:00", b"07:00")), "draft.csv"), "dry_run": "1"},
+                content_type="multipart/form-data",
+            )
+            self.client.post(f"{draft.headers['Location']}/discard")
+            self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO(b"not,a,schedule\n1,2,3\n"), "junk.csv")},
+                content_type="multipart/form-data",
+            )
+            blob_dir = os.path.join(upload_dir, "blobs")
+            blobs = [os.path.join(root, name) for root, _, names in os.walk(blob_dir) for name in names]
+            self.assertEqual(len(blobs), 3)
+            self.assertEqual(sweep(30)["removed_blobs"], 0)  # too recent; a preview may still use them
+
+            result = sweep(30, now=datetime.utcnow() + timedelta(days=31))
+            self.assertEqual(result["forgotten"], 2)
+            self.assertEqual(result["removed_blobs"], 3)
+            self.assertEqual(ImportFile.query.count(), 0)
+            self.assertFalse(any(os.path.exists(path) for path in blobs))
+
+    # ==================== TEST 16: Multi-level Cache ====================
+    def test_multi_level_cache(self):
+        """
+        Test 16: Multi-level Cache
+        - Serve repeated API reads from the cache
+        - Invalidate by tag when a tracked table commits
+        - Store values under the tag versions read before computing them
+        - Reach other workers through the change-log cursor without a shared tier
+        - Share entries and invalidations through the filesystem tier
+        - Sweep expired entries and cap the shared tier's size
+        """
+        import tempfile
+        from src.cache import Cache
+
+        with self.app.app_context():
+            first = self.client.get("/api/v1/rooms")
+            second = self.client.get("/api/v1/rooms")
+            self.assertEqual(first.headers["X-Cache"], "MISS")
+            self.assertEqual(second.headers["X-Cache"], "HIT")
+            self.assertEqual(first.get_json(), second.get_json())
+
+            db.session.add(Room(building="CacheHall", number="1", status="Available"))
+            db.session.commit()
+            third = self.client.get("/api/v1/rooms")
+            self.assertEqual(third.headers["X-Cache"], "MISS")
+            self.assertEqual(len(third.get_json()["data"]), 3)
+
+            self.client.get("/api/v1/imports")
+            self.assertEqual(self.client.get("/api/v1/imports").headers["X-Cache"], "HIT")
+            csv_data = b"Room,Date,OpenTime,CloseTime\nTestBuilding 101,2025-12-24,08:00:00,09:00:00\n"
+            self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO(csv_data), "cache.csv"), "uploaded_by": "registrar"},
+                content_type="multipart/form-data",
+            )
+            imports = self.client.get("/api/v1/imports")
+            self.assertEqual(imports.headers["X-Cache"], "MISS")
+            self.assertEqual(len(imports.get_json()["data"]), 1)
+
+            # A write committing while a value is computed must not hide behind it.
+            from src.cache import cache
+            reads = []
+
+            @cache.memoize(tags=("rooms",))
+            def racing_read():
+                reads.append(len(reads))
+                if len(reads) == 1:
+                    cache.invalidate_tags({"rooms"})
+                return reads[-1]
+
+            self.assertEqual(racing_read(), 0)
+            self.assertEqual(racing_read(), 1)
+            self.assertEqual(racing_read(), 1)
+
+            metrics = self.client.get("/api/v1/cache").get_json()["data"]
+            self.assertGreaterEqual(metrics["memory_hits"], 1)
+
+            # Without a shared tier, another worker sees the write through the change-log cursor.
+            self.app.config["CACHE_TAG_REFRESH"] = 0
+            other_worker = Cache()
+            other_worker.init_app(self.app)
+            other_worker.set("rooms", "old", tags=("rooms",))
+            self.assertEqual(other_worker.get("rooms"), "old")
+            db.session.add(Room(building="CacheHall", number="2", status="Available"))
+            db.session.commit()
+            self.assertIsNone(other_worker.get("rooms"))
+            self.assertGreaterEqual(metrics["invalidations"], 1)
+
+        with tempfile.TemporaryDirectory() as cache_dir, self.app.app_context():
+            self.app.config.update(CACHE_DIR=cache_dir, CACHE_TAG_REFRESH=0)
+            worker_a, worker_b = Cache(), Cache()
+            worker_a.init_app(self.app)
+            worker_b.init_app(self.app)
+
+            worker_a.set("answer", 42, ttl=60, tags=("rooms",))
+            self.assertEqual(worker_b.get("answer"), 42)
+            self.assertEqual(worker_b.stats["shared_hits"], 1)
+
+            worker_a.invalidate_tags({"rooms"})
+            self.assertIsNone(worker_b.get("answer"))
+            worker_b.invalidate_tags({"rooms"})
+            self.assertEqual(worker_a.shared.tag_version("rooms"), 2)
+
+            # Expired files are swept; the size cap then evicts the oldest live ones.
+            worker_a.set("stale", "old", ttl=-1)
+            worker_a.set("fresh", "new", ttl=60)
+            result = worker_a.shared.sweep()
+            self.assertEqual((result["expired"], result["evicted"]), (1, 0))
+            self.assertEqual(worker_b.get("fresh"), "new")
+            output = self.app.test_cli_runner().invoke(args=["sweep-cache", "--max-bytes", "0"]).output
+            self.assertIn("Removed 0 expired and 2 evicted", output)
+            self.assertIsNone(worker_a.shared.get("fresh"))
+
+    # ==================== TEST 17: Room Snapshot ====================
+    def test_room_snapshot(self):
+        """
+        Test 17: Columnar Room Snapshot
+        - Build rooms and today's intervals into shared arrays
+        - Reuse the snapshot until the change-log cursor moves
+        - Serve the dashboard and rooms API from it
+        """
+        from src.snapshot import room_snapshot
+
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            db.session.add(Schedule(room_id=room.id, date=date.today(), open_time=time(8, 0), close_time=time(9, 30)))
+            db.session.commit()
+
+            snapshot = room_snapshot.current()
+            self.assertIs(room_snapshot.current(), snapshot)
+            self.assertEqual(len(snapshot), 2)
+            self.assertIs(snapshot.buildings[0], snapshot.buildings[1])
+            self.assertEqual(snapshot.intervals(room.id), [(time(8, 0), time(9, 30))])
+            self.assertTrue(snapshot.scheduled_now(room.id, time(9, 0)))
+            self.assertFalse(snapshot.scheduled_now(room.id, time(9, 30)))
+
+            response = self.client.get("/dashboard")
+            self.assertIn("Today: 08:00–09:30".encode(), response.data)
+
+            room.toggle_status()
+            db.session.commit()
+            refreshed = room_snapshot.current()
+            self.assertIsNot(refreshed, snapshot)
+            self.assertEqual(refreshed.room(room.id).status, "Occupied")
+
+            data = self.client.get("/api/v1/rooms?fields=status").get_json()["data"]
+            self.assertEqual(data[0], {"id": room.id, "status": "Occupied"})
+
+    # ==================== TEST 18: Optimistic Status Toggle ====================
+    def test_optimistic_room_toggle(self):
+        """
+        Test 18: Optimistic Room Toggle
+        - Toggle with the version the client saw
+        - Reject a stale version with 409 and the current state
+        - Keep the form POST fallback and the ORM version check
+        """
+        from sqlalchemy.orm.exc import StaleDataError
+
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            url = f"/rooms/{room.id}/toggle"
+            self.assertEqual(room.version, 1)
+            self.assertEqual(self.client.get(url).status_code, 405)
+
+            response = self.client.post(url, json={"version": 1})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json(), {"id": room.id, "status": "Occupied", "version": 2})
+
+            stale = self.client.post(url, json={"version": 1})
+            self.assertEqual(stale.status_code, 409)
+            self.assertEqual(stale.get_json()["status"], "Occupied")
+            self.assertEqual(stale.get_json()["version"], 2)
+
+            response = self.client.post(url, data={"version": "1"}, follow_redirects=True)
+            self.assertIn(b"was changed by someone else", response.data)
+            response = self.client.post(url, data={"version": "2"})
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(self.client.post("/rooms/99999/toggle", json={}).status_code, 404)
+
+            db.session.refresh(room)
+            self.assertEqual((room.status, room.version), ("Available", 3))
+
+            # A plain ORM write of an outdated copy fails instead of overwriting.
+            rooms = Room.__table__
+            db.session.execute(rooms.update().where(rooms.c.id == room.id).values(version=rooms.c.version + 1))
+            room.status = "Occupied"
+            with self.assertRaises(StaleDataError):
+                db.session.commit()
+            db.session.rollback()
+
+    # ==================== TEST 19: Recurring Schedules ====================
+    def test_recurring_schedules(self):
+        """
+        Test 19: Recurring Schedules
+        - Store a weekly run from an import as one recurrence with exceptions
+        - Keep non-repeating rows as individual schedules
+        - Expand recurrences in the timeline, export, schedules API and live snapshot
+        """
+        from datetime import timedelta
+        from src.models import Recurrence
+        from src.snapshot import room_snapshot
+
+        mondays = [date(2026, 1, 5) + timedelta(weeks=week) for week in range(6)]
+        lines = ["Room,Date,OpenTime,CloseTime"]
+        lines += [f"TestBuilding 101,{day},09:00:00,11:00:00" for day in mondays if day != mondays[2]]
+        lines.append("TestBuilding 102,2026-01-06,13:00:00,14:00:00")
+        with self.app.app_context():
+            response = self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO("\n".join(lines).encode()), "term.csv")},
+                content_type="multipart/form-data",
+                follow_redirects=True,
+            )
+            self.assertIn(b"Imported 1 schedule rows and 1 weekly series (6 dated sessions)", response.data)
+            audit.flush()
+            self.assertIn("1 rows and 1 weekly series (6 dated sessions)", AuditLog.query.one().details)
+            self.assertEqual(Schedule.query.count(), 1)
+            recurrence = Recurrence.query.one()
+            self.assertEqual(recurrence.weekday, 0)
+            self.assertEqual((recurrence.start_date, recurrence.end_date), (mondays[0], mondays[-1]))
+            self.assertEqual(recurrence.exceptions, mondays[2].isoformat())
+
+            week = self.client.get("/api/v1/timeline?building=TestBuilding&date=2026-01-05&span=week").get_json()
+            room_101 = [room for room in week["data"][0]["rooms"] if room["number"] == "101"][0]
+            self.assertEqual(room_101["intervals"][0]["open"], "09:00")
+
+            exception_day = self.client.get("/api/v1/timeline?building=TestBuilding&date=2026-01-19").get_json()
+            self.assertTrue(all(not room["intervals"] for room in exception_day["data"][0]["rooms"]))
+
+            export = self.client.get("/export/schedules").data.decode()
+            self.assertEqual(export.count("\n"), 7)
+            self.assertNotIn("2026-01-19", export)
+
+            listed, cursor = [], None
+            while True:
+                query = "/api/v1/schedules?limit=2&fields=date,recurrence_id" + (f"&cursor={cursor}" if cursor else "")
+                page = self.client.get(query).get_json()
+                listed += page["data"]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            self.assertEqual([row["date"] for row in listed], ["2026-01-06"] + [
+                day.isoformat() for day in mondays if day != mondays[2]
+            ])
+            self.assertEqual([row["recurrence_id"] for row in listed], [None] + [recurrence.id] * 5)
+            january = self.client.get("/api/v1/schedules?from=2026-01-06&to=2026-01-31").get_json()["data"]
+            self.assertEqual([row["date"] for row in january], ["2026-01-06", "2026-01-12", "2026-01-26"])
+
+            db.session.add(Recurrence(
+                room_id=recurrence.room_id, weekday=date.today().weekday(), open_time=time(0, 0),
+                close_time=time(23, 59), start_date=date.today() - timedelta(weeks=1),
+                end_date=date.today() + timedelta(weeks=1),
+            ))
+            db.session.commit()
+            snapshot = room_snapshot.current()
+            self.assertEqual(snapshot.intervals(recurrence.room_id), [(time(0, 0), time(23, 59))])
+
+    # ==================== TEST 20: Dashboard Summary ====================
+    def test_dashboard_summary(self):
+        """
+        Test 20: Dashboard Summary Counters
+        - Count rooms by status and open issues per building
+        - Compute everything in a single grouped query
+        - Reflect issue and status changes at once (no caching)
+        """
+        from sqlalchemy import event
+        from src.summary import building_summary
+
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            db.session.add_all([
+                Room(building="Annex", number="1", status="Available"),
+                Issue(room_id=room.id, description="Broken chair"),
+                Issue(room_id=room.id, description="No chalk"),
+                Issue(room_id=room.id, description="Fixed light", status="Resolved"),
+            ])
+            db.session.commit()
+
+            statements = []
+            counter = lambda *args: statements.append(args[2])
+            event.listen(db.engine, "before_cursor_execute", counter)
+            try:
+                summary = building_summary()
+            finally:
+                event.remove(db.engine, "before_cursor_execute", counter)
+            self.assertEqual(len(statements), 1)
+            self.assertEqual(summary, [
+                {"building": "Annex", "rooms": 1, "available": 1, "occupied": 0, "open_issues": 0},
+                {"building": "TestBuilding", "rooms": 2, "available": 1, "occupied": 1, "open_issues": 2},
+            ])
+
+            response = self.client.get("/dashboard")
+            self.assertIn(b"All buildings", response.data)
+
+            self.assertEqual(building_summary(), summary)
+            Issue.query.filter_by(description="No chalk").first().status = "Resolved"
+            db.session.commit()
+            self.assertEqual(building_summary()[1]["open_issues"], 1)
+
+    # ==================== TEST 23: Kiosk Payloads ====================
+    def test_kiosk_payloads(self):
+        """
+        Test 23: Kiosk Full and Delta Payloads
+        - Serve one building's rooms and today's intervals with a version token
+        - Answer an up-to-date kiosk with an empty delta
+        - Send only the toggled room, and everything after a schedule change
+        - List rooms moved out of the building as removed, not other buildings' changes
+        """
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            other = load_rows(Room, [{"building": "Annex", "number": "001", "status": "Available"}])[0]
+            load_rows(Schedule, [{"room_id": room.id, "date": date.today(),
+                                  "open_time": time(9, 0), "close_time": time(10, 30)}])
+
+            self.assertEqual(self.client.get("/api/v1/kiosk/Nowhere").status_code, 404)
+            self.assertEqual(self.client.get("/kiosk/TestBuilding").status_code, 200)
+
+            full = self.client.get("/api/v1/kiosk/TestBuilding").get_json()
+            self.assertTrue(full["full"])
+            self.assertEqual(full["date"], date.today().isoformat())
+            self.assertEqual([r["number"] for r in full["rooms"]], ["101", "102"])
+            self.assertEqual(full["rooms"][0]["intervals"], [[32400, 37800]])
+
+            version = full["version"]
+            unchanged = self.client.get(f"/api/v1/kiosk/TestBuilding?since={version}").get_json()
+            self.assertEqual(unchanged, {"version": version, "full": False, "rooms": [], "removed": []})
+
+            self.client.post(f"/rooms/{room.id}/toggle", json={})
+            self.client.post(f"/rooms/{other}/toggle", json={})
+            delta = self.client.get(f"/api/v1/kiosk/TestBuilding?since={version}").get_json()
+            self.assertFalse(delta["full"])
+            self.assertNotEqual(delta["version"], version)
+            self.assertEqual(delta["rooms"], [
+                {"id": room.id, "number": "101", "status": "Occupied", "intervals": [[32400, 37800]]}
+            ])
+            self.assertEqual(delta["removed"], [])  # Annex rooms are not TestBuilding's business
+
+            moved = Room.query.filter_by(number="102").first()
+            moved.building = "Annex"
+            db.session.commit()
+            annex = self.client.get(f"/api/v1/kiosk/Annex?since={delta['version']}").get_json()
+            self.assertEqual([r["number"] for r in annex["rooms"]], ["102"])
+            moved_out = self.client.get(f"/api/v1/kiosk/TestBuilding?since={delta['version']}").get_json()
+            self.assertEqual((moved_out["rooms"], moved_out["removed"]), ([], [moved.id]))
+            change = self.client.get(f"/api/v1/changes?since={delta['version'].split('.')[1]}").get_json()
+            self.assertEqual(change["changes"][0]["op"], "update")
+            delta = moved_out
+
+            load_rows(Schedule, [{"room_id": room.id, "date": date.today(),
+                                  "open_time": time(14, 0), "close_time": time(15, 0)}])
+            after_import = self.client.get(f"/api/v1/kiosk/TestBuilding?since={delta['version']}").get_json()
+            self.assertTrue(after_import["full"])
+            self.assertEqual(after_import["rooms"][0]["intervals"], [[32400, 37800], [50400, 54000]])
+            stale_day = self.client.get("/api/v1/kiosk/TestBuilding?since=2000-01-01.1").get_json()
+            self.assertTrue(stale_day["full"])
+
+    # ==================== TEST 24: Batched Exports ====================
+    def test_batched_schedule_exports(self):
+        """
+        Test 24: Batched CSV and XLSX Exports
+        - Read occurrences in date windows, in the same order as one query
+        - Stream the CSV export, recurrences included
+        - Build an XLSX export with one sheet per building
+        """
+        from openpyxl import load_workbook
+        from src.models import Recurrence
+        from src.recurrence import occurrence_batches, occurrences
+
+        with self.app.app_context():
+            room = Room.query.filter_by(number="101").first()
+            annex = load_rows(Room, [{"building": "Annex: East", "number": "001", "status": "Available"}])[0]
+            load_rows(Schedule, [
+                {"room_id": room.id, "date": date(2026, 3, day), "open_time": time(9), "close_time": time(10)}
+                for day in (2, 15, 31)
+            ])
+            load_rows(Recurrence, [{
+                "room_id": annex, "weekday": 0, "open_time": time(13), "close_time": time(14),
+                "start_date": date(2026, 3, 2), "end_date": date(2026, 3, 30), "exceptions": "2026-03-16",
+            }])
+
+            batches = list(occurrence_batches(batch_days=4, newest_first=True))
+            self.assertGreater(len(batches), 1)
+            self.assertEqual([row for batch in batches for row in batch], occurrences()[::-1])
+
+            response = self.client.get("/export/schedules")
+            self.assertTrue(response.is_streamed)
+            lines = response.get_data(as_text=True).splitlines()
+            self.assertEqual(lines[0], "Building,Room,Date,Open Time,Close Time")
+            self.assertEqual(lines[1], "TestBuilding,101,2026-03-31,09:00:00,10:00:00")
+            self.assertEqual(len(lines), 1 + 3 + 4)
+
+            response = self.client.get("/export/schedules?format=xlsx&sheets=building")
+            self.assertEqual(
+                response.mimetype, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+            workbook = load_workbook(BytesIO(response.data), read_only=True)
+            self.assertEqual(workbook.sheetnames, ["Annex- East", "TestBuilding"])
+            annex_rows = list(workbook["Annex- East"].iter_rows(min_row=2, values_only=True))
+            self.assertEqual([row[2].day for row in annex_rows], [30, 23, 9, 2])
+            self.assertEqual(len(list(workbook["TestBuilding"].iter_rows(values_only=True))), 4)
+
+            single = load_workbook(BytesIO(self.client.get("/export/schedules?format=xlsx").data), read_only=True)
+            self.assertEqual(single.sheetnames, ["Schedules"])
+
+    # ==================== TEST 25: Automatic Room Status ====================
+    def test_schedule_driven_room_status(self):
+        """
+        Test 25: Schedule-driven Room Status
+        - Catch up rooms whose session already started when the day is loaded
+        - Flip statuses when heap entries fall due, with versions and change log
+        - Pick up a newly added schedule without reloading unaffected rooms
+        - Leave a manual toggle made after the last boundary alone on restart
+        """
+        from datetime import datetime, timedelta
+        from sqlalchemy import update
+        from src.changelog import latest_cursor
+        from src.models import ChangeLog
+        from src.status_scheduler import StatusScheduler, _as_utc
+
+        with self.app.app_context():
+            today = date.today()
+            at = lambda hour, minute=0: datetime.combine(today, time(hour, minute))
+            first = Room.query.filter_by(number="101").first()
+            second = Room.query.filter_by(number="102").first()
+            load_rows(Schedule, [
+                {"room_id": first.id, "date": today, "open_time": time(9), "close_time": time(10)},
+                {"room_id": first.id, "date": today, "open_time": time(10), "close_time": time(11)},
+                {"room_id": second.id, "date": today, "open_time": time(13), "close_time": time(14)},
+            ])
+            # The seeded rooms were last written before today's first boundary.
+            db.session.execute(update(ChangeLog).values(changed_at=datetime.combine(today - timedelta(days=1), time())))
+            db.session.commit()
+            status = lambda room: db.session.execute(
+                db.select(Room.status, Room.version).where(Room.id == room.id)
+            ).one()
+
+            scheduler = StatusScheduler()
+            self.assertFalse(self.app.config["AUTO_STATUS_ENABLED"])
+            self.assertEqual(scheduler.refresh(at(9, 30)), 1)
+            self.assertEqual(tuple(status(first)), ("Occupied", 2))
+            self.assertEqual(tuple(status(second)), ("Occupied", 1))  # first session still ahead
+            self.assertEqual(scheduler.next_due, at(10))
+
+            # Back-to-back sessions keep the room occupied.
+            self.assertEqual(scheduler.run_due(at(10)), 0)
+            cursor = latest_cursor()
+            self.assertEqual(scheduler.run_due(at(11)), 1)
+            self.assertEqual(tuple(status(first)), ("Available", 3))
+            self.assertEqual(latest_cursor(), cursor + 1)
+
+            load_rows(Schedule, [{"room_id": first.id, "date": today, "open_time": time(11, 30),
+                                  "close_time": time(12)}])
+            self.assertEqual(scheduler.refresh(at(11, 15)), 0)
+            self.assertEqual(scheduler.next_due, at(11, 30))
+            self.assertEqual(scheduler.run_due(at(11, 30)), 1)
+            self.assertEqual(status(first).status, "Occupied")
+
+            self.assertEqual(scheduler.run_due(at(13)), 1)  # 102 was already marked Occupied
+            self.assertEqual((status(first).status, status(second).status), ("Available", "Occupied"))
+            self.assertEqual(scheduler.run_due(at(14)), 1)
+            self.assertEqual(status(second).status, "Available")
+            self.assertIsNone(scheduler.next_due)
+            audit.flush()
+            self.assertEqual(AuditLog.query.filter_by(action="room.auto_status").count(), 5)
+
+            self.client.post(f"/rooms/{second.id}/toggle", json={})
+            db.session.execute(
+                update(ChangeLog).where(ChangeLog.id == latest_cursor()).values(changed_at=_as_utc(at(14, 30)))
+            )
+            db.session.commit()
+            self.assertEqual(StatusScheduler().refresh(at(15)), 0)
+            self.assertEqual(status(second).status, "Occupied")
+
+    # ==================== TEST 26: Change Log Retention ====================
+    def test_change_log_retention(self):
+        """
+        Test 26: Change Log Retention
+        - Prune old rows but always keep the newest cursor
+        - Keep rows after a cursor still in use
+        - Answer a cursor older than the pruned history with 410 and the latest cursor
+        - Never hand back a cursor past the end of the log
+        """
+        from datetime import datetime, timedelta
+        from src.changelog import latest_cursor, oldest_cursor, prune
+
+        with self.app.app_context():
+            start = latest_cursor()
+            for _ in range(3):
+                self.client.post(f"/rooms/{Room.query.first().id}/toggle", json={})
+            newest = latest_cursor()
+            later = datetime.utcnow() + timedelta(days=31)
+
+            self.assertEqual(prune(30, keep_after=newest - 2, now=later), newest - 2)
+            self.assertEqual(oldest_cursor(), newest - 2)
+            self.assertEqual(prune(30, now=datetime.utcnow()), 0)
+            self.assertEqual(prune(30, now=later), 1)
+            self.assertEqual((oldest_cursor(), latest_cursor()), (newest - 1, newest))
+
+            gone = self.client.get(f"/api/v1/changes?since={start}")
+            self.assertEqual((gone.status_code, gone.get_json()["latest_cursor"]), (410, newest))
+            self.assertEqual(self.client.get("/api/v1/changes?since=0").status_code, 410)
+            ahead = self.client.get(f"/api/v1/changes?since={10 ** 9}").get_json()
+            self.assertEqual((ahead["changes"], ahead["next_cursor"]), ([], newest))
+            fresh = self.client.get(f"/api/v1/changes?since={newest - 1}").get_json()
+            self.assertEqual(len(fresh["changes"]), 1)
+
+            result = self.app.test_cli_runner().invoke(args=["prune-changes", "--days", "30"])
+            self.assertIn("Removed 0 change-log row(s) older than 30 days.", result.output)
+
 
 if __name__ == "__main__":
     from typing import cast
@@ -0,0 +1,97 @@
+import unittest
+import warnings
+from datetime import date, time, timedelta
+from io import BytesIO
+
+warnings.filterwarnings("ignore", category=Warning)
+
+from src.models import Recurrence, Room, Schedule
+from src.summary import building_summary
+from tests.harness import AppTestCase, load_rows
+
+TERM_START = date(2026, 1, 5)  # a Monday
+TERM_WEEKS = 40
+
+
+class TestLargeDataImport(AppTestCase):
+    """Large-data scenarios on the shared in-memory database"""
+
+    # ==================== TEST 21: 100k-row Import ====================
+    def test_hundred_thousand_row_import(self):
+        """
+        Test 21: 100k-row Timetable Import
+        - Upload a 100,000 row CSV through the import form
+        - Store 80,000 weekly rows as 2,000 recurrences
+        - Keep the 20,000 one-off rows as schedules
+        """
+        lines = ["Room,Date,OpenTime,CloseTime"]
+        for room in range(500):
+            label = f"B{room % 10} {room:03d}"
+            for slot in range(4):
+                first = TERM_START + timedelta(days=slot)
+                lines.extend(
+                    f"{label},{first + timedelta(weeks=week)},{8 + 2 * slot:02d}:00:00,{9 + 2 * slot:02d}:30:00"
+                    for week in range(TERM_WEEKS)
+                )
+            # One-off bookings: a different start minute each, so none repeat weekly.
+            lines.extend(
+                f"{label},{TERM_START + timedelta(days=extra)},18:{extra:02d}:00,19:{extra:02d}:00"
+                for extra in range(40)
+            )
+        csv_data = "\n".join(lines).encode()
+
+        with self.app.app_context():
+            response = self.client.post(
+                "/import",
+                data={"schedule_file": (BytesIO(csv_data), "term.csv")},
+                content_type="multipart/form-data",
+                follow_redirects=True,
+            )
+            self.assertIn(b"Imported 20000 schedule rows and 2000 weekly series (100000 dated sessions)", response.data)
+            self.assertEqual(Recurrence.query.count(), 2000)
+            self.assertEqual(Schedule.query.count(), 20000)
+            self.assertEqual(Room.query.count(), 500)
+
+            day = self.client.get("/api/v1/timeline?building=B3&date=2026-01-06").get_json()["data"][0]
+            self.assertEqual(len(day["rooms"]), 50)
+            self.assertEqual(sum(len(room["intervals"]) for room in day["rooms"]), 100)
+
+    # ==================== TEST 22: Bulk Fixtures ====================
+    def test_bulk_fixture_reads(self):
+        """
+        Test 22: Reads over 100k Bulk-loaded Schedules
+        - Load 1,000 rooms and 100,000 schedules with Core inserts
+        - Summarise rooms per building in one query
+        - Export and page through every schedule
+        """
+        with self.app.app_context():
+            room_ids = load_rows(Room, [
+                {"building": f"Hall{n % 20}", "number": f"{n:04d}", "status": "Available" if n % 3 else "Occupied"}
+                for n in range(1000)
+            ])
+            schedule_ids = load_rows(Schedule, [
+                {
+                    "room_id": room_ids[n % 1000],
+                    "date": TERM_START + timedelta(days=n // 1000),
+                    "open_time": time(8 + n % 10),
+                    "close_time": time(9 + n % 10),
+                }
+                for n in range(100000)
+            ], log_changes=False)
+
+            summary = {row["building"]: row for row in building_summary()}
+            self.assertEqual(len(summary), 20)
+            self.assertEqual(summary["Hall0"]["rooms"], 50)
+
+            export = self.client.get("/export/schedules").data
+            self.assertEqual(export.count(b"\n"), 100001)
+
+            page = self.client.get(
+                f"/api/v1/schedules?limit=500&cursor={schedule_ids[-501]}&fields=date"
+            ).get_json()
+            self.assertEqual(len(page["data"]), 500)
+            self.assertIsNone(page["next_cursor"])
+
+
+if __name__ == "__main__":
+    unittest.main()